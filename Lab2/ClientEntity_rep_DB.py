@@ -1,88 +1,127 @@
 import mysql.connector
-from functools import wraps
-
-class DatabaseConnectionSingleton:
-    _instance = None
-
-    def __new__(cls, db_config):
-        if cls._instance is None:
-            cls._instance = super(DatabaseConnectionSingleton, cls).__new__(cls)
-            cls._instance._initialize(db_config)
-        return cls._instance
-
-    def _initialize(self, db_config):
-        self.connection = mysql.connector.connect(**db_config)
-        self.cursor = self.connection.cursor(dictionary=True)
-
-    def execute_query(self, query, params=None):
-        self.cursor.execute(query, params)
-        return self.cursor.fetchall()
-
-    def execute_update(self, query, params=None):
-        self.cursor.execute(query, params)
-        self.connection.commit()
-        return self.cursor.lastrowid
-
-    def __del__(self):
-        if self.cursor:
-            self.cursor.close()
-        if self.connection:
-            self.connection.close()
-
-
-def with_filter_and_sort(func):
-    @wraps(func)
-    def wrapper(self, *args, **kwargs):
-        filters = kwargs.get('filters', {})
-        sort_by = kwargs.get('sort_by')
-
-        filter_conditions = []
-        filter_values = []
-        for field, value in filters.items():
-            filter_conditions.append(f"{field} = %s")
-            filter_values.append(value)
-        where_clause = f"WHERE {' AND '.join(filter_conditions)}" if filter_conditions else ""
-        
-        # Формируем часть ORDER BY для сортировки
-        order_clause = f"ORDER BY {sort_by}" if sort_by else ""
-        
-        # Вызываем исходный метод с добавлением условий
-        return func(self, *args, where_clause=where_clause, filter_values=filter_values, order_clause=order_clause)
-    
-    return wrapper
-
+from connection_pool import ConnectionPool
+from query_builder import CountCache, QueryBuilder
 
 class ClientEntityRepDB:
-    def __init__(self, db_config):
-        self.db = DatabaseConnectionSingleton(db_config)
-
-    @with_filter_and_sort
-    def get_k_n_short_list(self, k, n, where_clause="", filter_values=None, order_clause=""):
-        filter_values = filter_values or []
-        offset = (k - 1) * n
-        query = f"SELECT * FROM client {where_clause} {order_clause} LIMIT %s OFFSET %s"
-        return self.db.execute_query(query, filter_values + [n, offset])
-
-    @with_filter_and_sort
-    def get_count(self, where_clause="", filter_values=None, order_clause=""):
-        filter_values = filter_values or []
-        query = f"SELECT COUNT(*) AS count FROM client {where_clause}"
-        result = self.db.execute_query(query, filter_values)
-        return result[0]['count'] if result else 0
+    # Колонки, по которым разрешены фильтрация и сортировка.
+    COLUMNS = ('id', 'name', 'email', 'phone')
+    # Колонки с отдельным индексом; набор постоянный и создаётся один раз.
+    INDEXES = ('name', 'email', 'phone')
+
+    def __init__(self, db_config, pool=None, pool_size=8):
+        # Пул можно передать готовым, чтобы несколько репозиториев делили соединения.
+        self.db = pool or ConnectionPool(lambda: mysql.connector.connect(**db_config),
+                                         max_size=pool_size, prepared_statements=True)
+        self.query = QueryBuilder('client', self.COLUMNS)
+        self.counts = CountCache()
+
+    def get_by_id(self, client_id):
+        rows = self.db.execute_prepared("SELECT * FROM client WHERE id = %s", (client_id,))
+        return rows[0] if rows else None
+
+    def get_k_n_short_list(self, k, n, filters=None, sort_by=None):
+        """Страница k по n клиентов; filters и sort_by - в формате QueryBuilder."""
+        query, params = self.query.select(filters, sort_by, limit=n, offset=(k - 1) * n)
+        return self.db.execute_prepared(query, params)
+
+    def get_count(self, filters=None):
+        query, params = self.query.count(filters)
+        key = self.counts.key(query, params)
+        count = self.counts.get(key)
+        if count is None:
+            generation = self.counts.generation
+            result = self.db.execute_prepared(query, params)
+            count = result[0]['count'] if result else 0
+            self.counts.put(key, count, generation)
+        return count
+
+    def get_page_with_total(self, k, n, filters=None, sort_by=None):
+        """Страница k по n клиентов и общее число клиентов под фильтром.
+
+        Если число уже есть в кэше, выполняется только выборка страницы; иначе
+        оно приходит в том же запросе (COUNT(*) OVER ()). Возвращает (rows, total).
+        """
+        key = self.counts.key(*self.query.count(filters))
+        total = self.counts.get(key)
+        if total is not None:
+            return self.get_k_n_short_list(k, n, filters, sort_by), total
+
+        generation = self.counts.generation
+        query, params = self.query.select(filters, sort_by, limit=n, offset=(k - 1) * n, with_total=True)
+        rows = self.db.execute_prepared(query, params)
+        if not rows:
+            # Пустая страница (например, за концом списка) числа не несёт.
+            return rows, self.get_count(filters)
+        total = rows[0]['total_count']
+        for row in rows:
+            del row['total_count']
+        self.counts.put(key, total, generation)
+        return rows, total
+
+    def get_page_after(self, last_sort_key=None, last_id=None, n=10, filters=None, sort_by=None):
+        """Страница из n клиентов, следующих за записью (last_sort_key, last_id).
+
+        Keyset-пагинация вместо LIMIT/OFFSET: выборка продолжается с последней
+        записи предыдущей страницы по индексу, поэтому глубокие страницы не
+        медленнее первой. Для первой страницы last_id=None. filters - в формате
+        QueryBuilder, sort_by - одна колонка сортировки (по умолчанию id).
+        NULL идут первыми, как в ORDER BY; для строки с NULL last_sort_key=None.
+        """
+        sort_by = self.query.check_column(sort_by or 'id')
+
+        conditions, values = self.query.conditions(filters)
+        if last_id is not None:
+            if sort_by == 'id':
+                conditions.append("id > %s")
+                values.append(last_id)
+            elif last_sort_key is None:
+                # NULL сортируются первыми: сначала оставшиеся строки с NULL, затем все прочие.
+                conditions.append(f"({sort_by} IS NULL AND id > %s OR {sort_by} IS NOT NULL)")
+                values.append(last_id)
+            else:
+                # Отдельное условие ">=" позволяет искать начало страницы по индексу.
+                conditions.append(f"{sort_by} >= %s AND ({sort_by} > %s OR id > %s)")
+                values += [last_sort_key, last_sort_key, last_id]
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"SELECT * FROM client {where_clause} {self.query.order_by(sort_by)} LIMIT %s"
+        return self.db.execute_prepared(query, values + [n])
+
+    def create_indexes(self):
+        """Создание индексов из INDEXES, которых ещё нет; вызывается один раз при настройке базы."""
+        # Первичный ключ InnoDB и так входит в каждый вторичный индекс, поэтому
+        # индекс по колонке подходит и для сортировки (колонка, id).
+        existing = {row['index_name'] for row in self.db.execute_query(
+            "SELECT DISTINCT index_name AS index_name FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = 'client'")}
+        for column in self.INDEXES:
+            name = f"idx_client_{column}"
+            if name in existing:
+                continue
+            try:
+                self.db.execute_update(f"CREATE INDEX {name} ON client ({column})")
+            except mysql.connector.Error as e:
+                # Индекс мог успеть создать другой процесс.
+                if e.errno != 1061:
+                    raise
 
     def add_client(self, client_data):
         query = "INSERT INTO client (name, email, phone) VALUES (%s, %s, %s)"
         params = (client_data['name'], client_data['email'], client_data['phone'])
-        return self.db.execute_update(query, params)
+        client_id = self.db.execute_update(query, params)
+        self.counts.invalidate()
+        return client_id
 
     def update_client_by_id(self, client_id, client_data):
         query = "UPDATE client SET name = %s, email = %s, phone = %s WHERE id = %s"
         params = (client_data['name'], client_data['email'], client_data['phone'], client_id)
         self.db.execute_update(query, params)
+        # Изменённые поля могут вывести клиента из-под фильтра или под него.
+        self.counts.invalidate()
 
     def delete_client_by_id(self, client_id):
         query = "DELETE FROM client WHERE id = %s"
         self.db.execute_update(query, (client_id,))
+        self.counts.invalidate()
 
 # Настройки базы данных
 db_config = {
@@ -94,6 +133,7 @@ db_config = {
 
 # Пример использования:
 client_db = ClientEntityRepDB(db_config)
+client_db.create_indexes()
 
 # Пример 1: Получение списка клиентов с фильтрацией и сортировкой
 filtered_clients = client_db.get_k_n_short_list(
@@ -1,10 +1,19 @@
 import sqlite3
+from itertools import islice
+from query_builder import CountCache, QueryBuilder
 
 class ClientEntity_rep_DB:
+    # Колонки, по которым разрешены фильтрация и сортировка.
+    COLUMNS = ('id', 'name', 'email', 'phone')
+    # Колонки с отдельным индексом; набор постоянный и создаётся один раз.
+    INDEXES = ('name', 'email', 'phone')
+
     def __init__(self, db_path):
         self.connection = sqlite3.connect(db_path)
         self.connection.row_factory = sqlite3.Row
         self.cursor = self.connection.cursor()
+        self.query = QueryBuilder('client', self.COLUMNS, placeholder='?', range_prefix=True)
+        self.counts = CountCache()
 
         self.cursor.execute('''
             CREATE TABLE IF NOT EXISTS client (
@@ -15,6 +24,7 @@ class ClientEntity_rep_DB:
             )
         ''')
         self.connection.commit()
+        self.create_indexes()
 
     @staticmethod
     def validate_string(value, field_name, max_length=None):
@@ -28,45 +38,184 @@ class ClientEntity_rep_DB:
             raise ValueError("Invalid email address")
         return value
 
+    def validate_client(self, client_data):
+        """Проверка данных клиента; возвращает кортеж (name, email, phone)."""
+        name = self.validate_string(client_data['name'], 'Name', max_length=100)
+        email = self.validate_email(client_data['email'])
+        phone = self.validate_string(client_data['phone'], 'Phone', max_length=15)
+        return name, email, phone
+
+    @staticmethod
+    def _chunks(rows, chunk_size):
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
     def get_by_id(self, client_id):
         query = "SELECT * FROM client WHERE id = ?"
         self.cursor.execute(query, (client_id,))
         return dict(self.cursor.fetchone())
 
-    def get_k_n_short_list(self, k, n):
-        offset = (k - 1) * n
-        query = f"SELECT * FROM client ORDER BY id LIMIT ? OFFSET ?"
-        self.cursor.execute(query, (n, offset))
+    def get_k_n_short_list(self, k, n, filters=None, sort_by=None):
+        """Страница k по n клиентов; filters и sort_by - в формате QueryBuilder."""
+        query, params = self.query.select(filters, sort_by, limit=n, offset=(k - 1) * n)
+        self.cursor.execute(query, params)
+        return [dict(row) for row in self.cursor.fetchall()]
+
+    def get_page_after(self, last_sort_key=None, last_id=None, n=10, filters=None, sort_by=None):
+        """Страница из n клиентов, следующих за записью (last_sort_key, last_id).
+
+        Keyset-пагинация: вместо OFFSET условие WHERE продолжает выборку с
+        последней записи предыдущей страницы, поэтому любая страница читается
+        по индексу так же быстро, как первая. Для первой страницы last_id=None.
+        filters - в формате QueryBuilder, sort_by - одна колонка сортировки (по
+        умолчанию id); при равных значениях порядок задаёт id. Значения NULL
+        идут первыми, как в ORDER BY; для строки с NULL last_sort_key=None.
+        """
+        sort_by = self.query.check_column(sort_by or 'id')
+
+        conditions, values = self.query.conditions(filters)
+        if last_id is not None:
+            if sort_by == 'id':
+                conditions.append("id > ?")
+                values.append(last_id)
+            elif last_sort_key is None:
+                # NULL сортируются первыми: сначала оставшиеся строки с NULL, затем все прочие.
+                conditions.append(f"({sort_by} IS NULL AND id > ? OR {sort_by} IS NOT NULL)")
+                values.append(last_id)
+            else:
+                # Отдельное условие ">=" позволяет искать начало страницы по индексу.
+                conditions.append(f"{sort_by} >= ? AND ({sort_by} > ? OR id > ?)")
+                values += [last_sort_key, last_sort_key, last_id]
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"SELECT * FROM client {where_clause} {self.query.order_by(sort_by)} LIMIT ?"
+        self.cursor.execute(query, values + [n])
         return [dict(row) for row in self.cursor.fetchall()]
 
+    def create_indexes(self):
+        """Индексы под сортировку и фильтры из INDEXES; вызывается при создании репозитория."""
+        # id входит в любой индекс SQLite как rowid, поэтому индекс по колонке
+        # подходит и для сортировки (колонка, id) в get_page_after.
+        for column in self.INDEXES:
+            self.cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_client_{column} ON client ({column})")
+        self.connection.commit()
+
     def add_client(self, client_data):
-        name = self.validate_string(client_data['name'], 'Name', max_length=100)
-        email = self.validate_email(client_data['email'])
-        phone = self.validate_string(client_data['phone'], 'Phone', max_length=15)
+        name, email, phone = self.validate_client(client_data)
         
         query = "INSERT INTO client (name, email, phone) VALUES (?, ?, ?)"
         self.cursor.execute(query, (name, email, phone))
         self.connection.commit()
+        self.counts.invalidate()
         return self.cursor.lastrowid
 
+    def add_clients_bulk(self, clients, chunk_size=1000):
+        """Добавление множества клиентов одной транзакцией.
+
+        clients может быть любым итерируемым объектом (в том числе генератором):
+        записи проверяются по мере чтения и вставляются пачками по chunk_size
+        через executemany. Если хоть одна запись не прошла проверку, транзакция
+        откатывается целиком. Возвращает число добавленных клиентов.
+        """
+        query = "INSERT INTO client (name, email, phone) VALUES (?, ?, ?)"
+        rows = (self._validate_numbered(number, client_data)
+                for number, client_data in enumerate(clients, 1))
+        return self._execute_bulk(query, rows, chunk_size)
+
+    def update_clients_bulk(self, updates, chunk_size=1000):
+        """Обновление множества клиентов одной транзакцией.
+
+        updates - итерируемый объект пар (client_id, client_data). Возвращает
+        число изменённых строк.
+        """
+        query = "UPDATE client SET name = ?, email = ?, phone = ? WHERE id = ?"
+        rows = (self._validate_numbered(number, client_data) + (client_id,)
+                for number, (client_id, client_data) in enumerate(updates, 1))
+        return self._execute_bulk(query, rows, chunk_size)
+
+    def _validate_numbered(self, number, client_data):
+        try:
+            return self.validate_client(client_data)
+        except (KeyError, ValueError) as e:
+            raise ValueError(f"Client #{number}: {e}") from e
+
+    def _execute_bulk(self, query, rows, chunk_size):
+        count = 0
+        # Контекстный менеджер соединения фиксирует транзакцию или откатывает её при ошибке.
+        with self.connection:
+            for chunk in self._chunks(rows, chunk_size):
+                self.cursor.executemany(query, chunk)
+                count += self.cursor.rowcount
+        self.counts.invalidate()
+        return count
+
     def update_client_by_id(self, client_id, client_data):
-        name = self.validate_string(client_data['name'], 'Name', max_length=100)
-        email = self.validate_email(client_data['email'])
-        phone = self.validate_string(client_data['phone'], 'Phone', max_length=15)
+        name, email, phone = self.validate_client(client_data)
         
         query = "UPDATE client SET name = ?, email = ?, phone = ? WHERE id = ?"
         self.cursor.execute(query, (name, email, phone, client_id))
         self.connection.commit()
+        # Изменённые поля могут вывести клиента из-под фильтра или под него.
+        self.counts.invalidate()
 
     def delete_client_by_id(self, client_id):
         query = "DELETE FROM client WHERE id = ?"
         self.cursor.execute(query, (client_id,))
         self.connection.commit()
+        self.counts.invalidate()
+
+    def get_count(self, filters=None):
+        query, params = self.query.count(filters)
+        key = self.counts.key(query, params)
+        count = self.counts.get(key)
+        if count is None:
+            generation = self.counts.generation
+            self.cursor.execute(query, params)
+            count = self.cursor.fetchone()[0]
+            self.counts.put(key, count, generation)
+        return count
+
+    def get_page_with_total(self, k, n, filters=None, sort_by=None):
+        """Страница k по n клиентов и общее число клиентов под фильтром.
+
+        Если число уже есть в кэше, выполняется только выборка страницы; иначе
+        оно приходит в том же запросе (COUNT(*) OVER ()). Возвращает (rows, total).
+        """
+        key = self.counts.key(*self.query.count(filters))
+        total = self.counts.get(key)
+        if total is not None:
+            return self.get_k_n_short_list(k, n, filters, sort_by), total
+
+        generation = self.counts.generation
+        query, params = self.query.select(filters, sort_by, limit=n, offset=(k - 1) * n, with_total=True)
+        self.cursor.execute(query, params)
+        rows = [dict(row) for row in self.cursor.fetchall()]
+        if not rows:
+            # Пустая страница (например, за концом списка) числа не несёт.
+            return rows, self.get_count(filters)
+        total = rows[0]['total_count']
+        for row in rows:
+            del row['total_count']
+        self.counts.put(key, total, generation)
+        return rows, total
 
-    def get_count(self):
-        query = "SELECT COUNT(*) AS count FROM client"
-        self.cursor.execute(query)
-        return self.cursor.fetchone()[0]
+    def export_iter(self, chunk_size=1000):
+        """Потоковая выгрузка всех клиентов в порядке id (по chunk_size строк за раз)."""
+        # Отдельный курсор, чтобы другие вызовы во время выгрузки не сбили выборку.
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("SELECT * FROM client ORDER BY id")
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                for row in rows:
+                    yield dict(row)
+        finally:
+            cursor.close()
 
     def __del__(self):
         if hasattr(self, 'cursor'):
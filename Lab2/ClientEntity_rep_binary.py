@@ -0,0 +1,194 @@
+import argparse
+import mmap
+import os
+import struct
+from bisect import bisect_left
+
+from ClientEntity_rep_jsonANDyaml import MyEntity, MyEntityRepBase, MyEntityRepJson, MyEntityRepYaml
+from ClientEntity_rep_jsonl import MyEntityRepJsonLines
+
+
+class MyEntityRepBinary(MyEntityRepBase):
+    """Репозиторий в компактном двоичном снимке, читаемом через mmap.
+
+    Формат файла (little-endian):
+        заголовок   magic(6s) version(H) count(Q) next_id(q)
+        порядок     count * offset(Q)      - смещения записей в порядке хранения
+        поиск       count * id(q)          - id, отсортированные по возрастанию
+                    count * position(Q)    - номер записи для каждого id
+        записи      length(I) id(q) name(utf-8)
+
+    Файл не разбирается целиком: страница читается по смещениям, поиск по id -
+    двоичный поиск в отсортированной секции. Изменения переписывают снимок.
+    """
+
+    MAGIC = b"MYENTB"
+    VERSION = 2
+    HEADER = struct.Struct("<6sHQq")
+    RECORD_LENGTH = struct.Struct("<I")
+    RECORD_ID = struct.Struct("<q")
+
+    def __init__(self, file_path):
+        super().__init__(file_path)
+        self._map = None
+        self._map_state = None
+        self._count = 0
+        self._offsets = None
+        self._sorted_ids = None
+        self._positions = None
+        self._stored_next_id = None
+
+    def iter_entities(self, start=0, count=None):
+        """Ленивый обход записей снимка, начиная с номера start."""
+        self._open()
+        start = max(start, 0)
+        end = self._count if count is None else min(self._count, start + count)
+        for position in range(start, end):
+            yield self._read_record(self._offsets[position])
+
+    def read_all(self):
+        return list(self.iter_entities())
+
+    def _read_data(self):
+        entities = self.read_all()
+        return entities, self._stored_next_id
+
+    def write_all(self, entities, next_id=None):
+        next_id = self._meta_next_id(entities, next_id)
+        records = []
+        for entity in entities:
+            payload = self.RECORD_ID.pack(entity.id) + entity.name.encode()
+            records.append(self.RECORD_LENGTH.pack(len(payload)) + payload)
+
+        count = len(records)
+        offset = self.HEADER.size + count * 8 * 3
+        offsets = []
+        for record in records:
+            offsets.append(offset)
+            offset += len(record)
+        lookup = sorted(range(count), key=lambda position: entities[position].id)
+
+        def dump(file):
+            file.write(self.HEADER.pack(self.MAGIC, self.VERSION, count, next_id))
+            file.write(struct.pack(f"<{count}Q", *offsets))
+            file.write(struct.pack(f"<{count}q", *(entities[position].id for position in lookup)))
+            file.write(struct.pack(f"<{count}Q", *lookup))
+            for record in records:
+                file.write(record)
+
+        # Открытый mmap не даёт заменить файл в Windows.
+        self._close()
+        self._atomic_write(dump, mode='wb')
+
+    def get_by_id(self, entity_id):
+        with self._lock():
+            if self._changes:
+                return super().get_by_id(entity_id)
+            self._open()
+            # Файла нет или он пуст: секций поиска нет.
+            if not self._count:
+                return None
+            index = bisect_left(self._sorted_ids, entity_id)
+            if index == self._count or self._sorted_ids[index] != entity_id:
+                return None
+            return self._read_record(self._offsets[self._positions[index]])
+
+    def get_k_n_short_list(self, k, n, sort_by=None):
+        with self._lock():
+            if self._changes or sort_by:
+                return super().get_k_n_short_list(k, n, sort_by)
+            if k < 1:
+                return []
+            return list(self.iter_entities((k - 1) * n, n))
+
+    def get_count(self):
+        with self._lock():
+            if self._changes:
+                return super().get_count()
+            self._open()
+            return self._count
+
+    def flush(self):
+        with self._thread_lock:
+            super().flush()
+            if not self._changes:
+                self._entities = {}
+                self._order = []
+                self._loaded = False
+
+    def close(self):
+        self._close()
+
+    def _open(self):
+        state = self._stat()
+        if self._map_state == state and (self._map is not None or state is None):
+            return
+        self._close()
+        self._map_state = state
+        if state is None or state[1] == 0:
+            return
+        with open(self.file_path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, next_id = self.HEADER.unpack_from(self._map, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            self._close()
+            raise ValueError(f"{self.file_path} is not a MyEntity binary snapshot")
+        view = memoryview(self._map)
+        start = self.HEADER.size
+        section = count * 8
+        self._count = count
+        self._stored_next_id = next_id
+        self._offsets = view[start:start + section].cast('Q')
+        self._sorted_ids = view[start + section:start + 2 * section].cast('q')
+        self._positions = view[start + 2 * section:start + 3 * section].cast('Q')
+
+    def _close(self):
+        for view in (self._offsets, self._sorted_ids, self._positions):
+            if view is not None:
+                view.release()
+        self._offsets = self._sorted_ids = self._positions = None
+        self._count = 0
+        self._stored_next_id = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._map_state = None
+
+    def _read_record(self, offset):
+        (length,) = self.RECORD_LENGTH.unpack_from(self._map, offset)
+        start = offset + self.RECORD_LENGTH.size
+        (entity_id,) = self.RECORD_ID.unpack_from(self._map, start)
+        name = self._map[start + self.RECORD_ID.size:start + length].decode()
+        return MyEntity(entity_id, name)
+
+
+REPOSITORIES_BY_EXTENSION = {
+    ".json": MyEntityRepJson,
+    ".yaml": MyEntityRepYaml,
+    ".yml": MyEntityRepYaml,
+    ".jsonl": MyEntityRepJsonLines,
+}
+
+
+def convert(source_path, target_path):
+    """Перенос сущностей из JSON/YAML/JSON Lines-файла в двоичный снимок."""
+    extension = os.path.splitext(source_path)[1].lower()
+    if extension not in REPOSITORIES_BY_EXTENSION:
+        raise ValueError(f"Unsupported source format: {extension}")
+    source = REPOSITORIES_BY_EXTENSION[extension](source_path)
+    # next_id переносится как есть: после удалений он больше max(id) + 1.
+    with source._lock():
+        entities, next_id = source._read_data()
+    target = MyEntityRepBinary(target_path)
+    target.write_all(entities, next_id)
+    return len(entities)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Конвертация JSON/YAML-файла сущностей в двоичный снимок")
+    parser.add_argument("source")
+    parser.add_argument("target")
+    args = parser.parse_args()
+    count = convert(args.source, args.target)
+    print(f"Сконвертировано сущностей: {count}, размер: "
+          f"{os.path.getsize(args.source)} -> {os.path.getsize(args.target)} байт")
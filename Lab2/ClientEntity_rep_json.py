@@ -2,7 +2,8 @@ import json
 import os
 
 class MyEntity:
-    
+    __slots__ = ("id", "name")
+
     def __init__(self, id, name):
         self.id = id
         self.name = name
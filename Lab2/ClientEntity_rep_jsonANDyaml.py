@@ -1,8 +1,27 @@
 import json
 import yaml
 import os
+import struct
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: fcntl нет, блокировки через msvcrt (только монопольные).
+    fcntl = None
+    import msvcrt
+
+# C-реализация LibYAML в 10-20 раз быстрее чистого Python; если PyYAML собран
+# без неё, используем обычные безопасные загрузчик и дампер.
+try:
+    from yaml import CSafeDumper as YamlDumper, CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeDumper as YamlDumper, SafeLoader as YamlLoader
 
 class MyEntity:
+    __slots__ = ("id", "name")
+
     def __init__(self, id, name):
         self.id = id
         self.name = name
@@ -10,81 +29,455 @@ class MyEntity:
     def to_dict(self):
         return {'id': self.id, 'name': self.name}
 
+    def copy(self):
+        return MyEntity(self.id, self.name)
+
     @classmethod
     def from_dict(cls, data):
         return cls(id=data['id'], name=data['name'])
 
+
+class ConcurrentModificationError(Exception):
+    """Файл изменён другим процессом после того, как данные были прочитаны."""
+
+
+# Номер версии данных в начале файла блокировки.
+_LOCK_VERSION = struct.Struct("<q")
+
+
+class _LockState(threading.local):
+    """Взятая потоком блокировка файла: открытый файл, её вид и глубина вложенности."""
+
+    def __init__(self):
+        self.file = None
+        self.exclusive = False
+        self.depth = 0
+
+
+def _fsync_directory(directory):
+    """Сброс на диск записи каталога, чтобы переименование пережило сбой питания."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
 class MyEntityRepBase:
+    """Базовый файловый репозиторий.
+
+    Файл читается один раз в память (словарь id -> сущность и список id в
+    порядке файла) и перечитывается, только если изменились его mtime или
+    размер. Изменения копятся в списке (op, id, entity) и сбрасываются на
+    диск одной записью в flush(); способ записи определяет _persist().
+    Внутри batch() запись откладывается до выхода из блока.
+
+    Наружу отдаются копии сущностей, а сохраняются копии переданных, поэтому
+    изменение объекта вызывающим кодом не меняет данные в памяти репозитория.
+
+    Следующий id хранится в файле вместе с сущностями (next_id), поэтому
+    добавление не перебирает все id. Сортировка не меняет порядок в файле:
+    для каждого поля лениво строится отсортированный список id, который
+    сбрасывается при любом изменении данных.
+
+    Несколько процессов могут работать с одним файлом: чтение идёт под
+    разделяемой блокировкой <file_path>.lock, изменение - под монопольной
+    (блокировка -> перечитывание -> изменение -> запись). В файле блокировки
+    хранится номер версии, который растёт с каждой записью; по нему процессы
+    замечают чужие изменения, а update_entity/delete_entity с expected_version
+    отказывают, если данные изменились после чтения.
+
+    Внутри процесса один экземпляр можно делить между потоками: обращения к
+    нему выполняются по очереди под threading.RLock, а состояние файловой
+    блокировки хранится отдельно для каждого потока.
+    """
+
     def __init__(self, file_path):
         self.file_path = file_path
+        self.lock_path = file_path + ".lock"
+        self._entities = {}
+        self._order = []
+        self._file_state = None
+        self._loaded = False
+        self._changes = []
+        self._batch_depth = 0
+        self._next_id = 1
+        self._sorted_views = {}
+        self._version = 0
+        self._thread_lock = threading.RLock()
+        self._lock_state = _LockState()
 
     def read_all(self):
         raise NotImplementedError("Метод должен быть реализован в подклассе.")
 
-    def write_all(self, entities):
+    def write_all(self, entities, next_id=None):
         raise NotImplementedError("Метод должен быть реализован в подклассе.")
 
+    def _read_data(self):
+        """Сущности и сохранённый в файле next_id (None, если его там нет)."""
+        return self.read_all(), None
+
+    @staticmethod
+    def _meta_next_id(entities, next_id):
+        # Файлы старого формата хранят только список сущностей.
+        if next_id is None:
+            next_id = max((entity.id for entity in entities), default=0) + 1
+        return next_id
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.file_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    @contextmanager
+    def _lock(self, exclusive=False):
+        """Рекомендательная блокировка файла <file_path>.lock.
+
+        Сначала берётся блокировка экземпляра между потоками, затем файловая.
+        Вложенные вызовы в том же потоке используют уже взятую блокировку. В
+        Windows разделяемых блокировок нет, поэтому там она всегда монопольная.
+        """
+        state = self._lock_state
+        with self._thread_lock:
+            if state.depth:
+                if exclusive and not state.exclusive:
+                    raise RuntimeError("Cannot upgrade a shared lock to an exclusive one")
+                state.depth += 1
+                try:
+                    yield
+                finally:
+                    state.depth -= 1
+                return
+            fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0))
+            with os.fdopen(fd, 'r+b', buffering=0) as file:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                else:
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                state.file, state.exclusive, state.depth = file, exclusive, 1
+                try:
+                    yield
+                finally:
+                    state.file, state.exclusive, state.depth = None, False, 0
+                    if fcntl is not None:
+                        fcntl.flock(fd, fcntl.LOCK_UN)
+                    else:
+                        file.seek(0)
+                        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+    def _read_version(self):
+        lock_file = self._lock_state.file
+        if lock_file is None:
+            with self._lock():
+                return self._read_version()
+        lock_file.seek(0)
+        data = lock_file.read(_LOCK_VERSION.size)
+        return _LOCK_VERSION.unpack(data)[0] if len(data) == _LOCK_VERSION.size else 0
+
+    def _bump_version(self):
+        """Увеличение версии после записи; вызывается под монопольной блокировкой."""
+        version = self._read_version() + 1
+        self._lock_state.file.seek(0)
+        self._lock_state.file.write(_LOCK_VERSION.pack(version))
+        return version
+
+    def _check_version(self, expected_version):
+        if expected_version is not None and self._read_version() != expected_version:
+            raise ConcurrentModificationError(
+                f"{self.file_path} changed since version {expected_version}")
+
+    def get_version(self):
+        """Текущая версия данных; меняется при каждой записи любым процессом."""
+        with self._lock():
+            return self._read_version()
+
+    def _load(self):
+        """Загрузка файла в память, если он изменился с момента прошлого чтения."""
+        if self._changes:
+            return
+        state = self._stat()
+        version = self._read_version()
+        if self._loaded and state == self._file_state and version == self._version:
+            return
+        entities, next_id = self._read_data()
+        self._entities = {entity.id: entity for entity in entities}
+        self._order = [entity.id for entity in entities]
+        self._next_id = self._meta_next_id(entities, next_id)
+        self._sorted_views = {}
+        self._file_state = state
+        self._version = version
+        self._loaded = True
+
+    def _all(self):
+        return [self._entities[entity_id] for entity_id in self._order]
+
+    def _record(self, op, entity_id, entity=None):
+        self._sorted_views = {}
+        self._changes.append((op, entity_id, entity))
+        if not self._batch_depth:
+            self.flush()
+
+    @contextmanager
+    def batch(self):
+        """Группировка изменений: на диск они попадут одной записью при выходе из блока.
+
+        Если внешний блок завершился исключением, накопленные изменения
+        отбрасываются и данные будут перечитаны из файла. Монопольная
+        блокировка держится до конца блока.
+        """
+        with self._lock(exclusive=True):
+            self._batch_depth += 1
+            try:
+                yield self
+            except BaseException:
+                if self._batch_depth == 1:
+                    self._changes = []
+                    self._loaded = False
+                raise
+            finally:
+                self._batch_depth -= 1
+            if not self._batch_depth:
+                self.flush()
+
+    def _atomic_write(self, dump, path=None, mode='w'):
+        """Запись во временный файл рядом с целевым и атомарная замена.
+
+        При сбое во время записи на диске остаётся прежняя версия файла.
+        """
+        path = path or self.file_path
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, mode) as file:
+                dump(file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        _fsync_directory(os.path.dirname(os.path.abspath(path)))
+
+    def flush(self):
+        """Запись накопленных изменений в файл (если они есть)."""
+        if not self._changes:
+            return
+        with self._lock(exclusive=True):
+            # Пока ждали блокировку, изменения мог записать другой поток.
+            if not self._changes:
+                return
+            # Изменения применялись к данным версии self._version; если файл
+            # с тех пор переписан в обход блокировки, запись потеряла бы его.
+            if self._read_version() != self._version or self._stat() != self._file_state:
+                self._changes = []
+                self._loaded = False
+                raise ConcurrentModificationError(f"{self.file_path} was modified by another process")
+            self._persist(self._changes)
+            self._file_state = self._stat()
+            self._version = self._bump_version()
+            self._changes = []
+
+    def _persist(self, changes):
+        """Сохранение изменений; по умолчанию файл переписывается целиком."""
+        self.write_all(self._all(), self._next_id)
+
+    def _sorted_view(self, field_name):
+        """Список id, отсортированный по полю; строится при первом обращении."""
+        view = self._sorted_views.get(field_name)
+        if view is None:
+            entities = self._entities
+            view = sorted(self._order, key=lambda entity_id: getattr(entities[entity_id], field_name))
+            self._sorted_views[field_name] = view
+        return view
+
     def get_by_id(self, entity_id):
-        entities = self.read_all()
-        for entity in entities:
-            if entity.id == entity_id:
-                return entity
-        return None
-
-    def get_k_n_short_list(self, k, n):
-        entities = self.read_all()
-        start = (k - 1) * n
-        end = start + n
-        return entities[start:end]
+        with self._lock():
+            self._load()
+            entity = self._entities.get(entity_id)
+            return entity.copy() if entity is not None else None
+
+    def get_k_n_short_list(self, k, n, sort_by=None):
+        with self._lock():
+            self._load()
+            if k < 1:
+                return []
+            order = self._sorted_view(sort_by) if sort_by else self._order
+            start = (k - 1) * n
+            end = start + n
+            return [self._entities[entity_id].copy() for entity_id in order[start:end]]
 
     def sort_by_field(self, field_name):
-        entities = self.read_all()
-        sorted_entities = sorted(entities, key=lambda x: getattr(x, field_name))
-        self.write_all(sorted_entities)
+        """Сущности, отсортированные по полю; порядок в файле не меняется."""
+        with self._lock():
+            self._load()
+            return [self._entities[entity_id].copy() for entity_id in self._sorted_view(field_name)]
 
     def add_entity(self, new_entity):
-        entities = self.read_all()
-        new_id = max(entity.id for entity in entities) + 1 if entities else 1
-        new_entity.id = new_id
-        entities.append(new_entity)
-        self.write_all(entities)
-
-    def update_entity(self, entity_id, updated_entity):
-        entities = self.read_all()
-        for i, entity in enumerate(entities):
-            if entity.id == entity_id:
-                entities[i] = updated_entity
-                break
-        self.write_all(entities)
-
-    def delete_entity(self, entity_id):
-        entities = self.read_all()
-        entities = [entity for entity in entities if entity.id != entity_id]
-        self.write_all(entities)
+        with self._lock(exclusive=True):
+            self._load()
+            new_id = self._next_id
+            self._next_id += 1
+            new_entity.id = new_id
+            stored = new_entity.copy()
+            self._entities[new_id] = stored
+            self._order.append(new_id)
+            self._record("add", new_id, stored)
+
+    def update_entity(self, entity_id, updated_entity, expected_version=None):
+        with self._lock(exclusive=True):
+            self._check_version(expected_version)
+            self._load()
+            if entity_id not in self._entities:
+                return
+            updated_entity.id = entity_id
+            stored = updated_entity.copy()
+            self._entities[entity_id] = stored
+            self._record("update", entity_id, stored)
+
+    def delete_entity(self, entity_id, expected_version=None):
+        with self._lock(exclusive=True):
+            self._check_version(expected_version)
+            self._load()
+            if self._entities.pop(entity_id, None) is None:
+                return
+            self._order.remove(entity_id)
+            self._record("delete", entity_id)
 
     def get_count(self):
-        return len(self.read_all())
+        with self._lock():
+            self._load()
+            return len(self._order)
 
 class MyEntityRepJson(MyEntityRepBase):
+    """JSON-репозиторий.
+
+    В режиме журнала (journal=True) изменения не переписывают снимок, а
+    дописываются строками JSON Lines в файл <file_path>.log. При чтении снимок
+    дополняется журналом; когда в журнале набирается compact_threshold записей,
+    он сворачивается в новый снимок (compact()).
+    """
+
+    def __init__(self, file_path, journal=False, compact_threshold=1000):
+        super().__init__(file_path)
+        self.journal = journal
+        self.journal_path = file_path + ".log"
+        self.compact_threshold = compact_threshold
+        self._journal_records = 0
+
     def read_all(self):
+        return self._read_data()[0]
+
+    def _read_data(self):
+        entities, next_id = self._read_snapshot()
+        if self.journal or os.path.exists(self.journal_path):
+            entities, next_id = self._replay_journal(entities, next_id)
+        return entities, next_id
+
+    def write_all(self, entities, next_id=None):
+        data = {
+            "next_id": self._meta_next_id(entities, next_id),
+            "entities": [entity.to_dict() for entity in entities],
+        }
+        self._atomic_write(lambda file: json.dump(data, file))
+
+    def _read_snapshot(self):
         if os.path.exists(self.file_path):
             with open(self.file_path, 'r') as file:
                 data = json.load(file)
-            return [MyEntity.from_dict(item) for item in data]
-        return []
+            if isinstance(data, list):
+                return [MyEntity.from_dict(item) for item in data], None
+            return [MyEntity.from_dict(item) for item in data["entities"]], data["next_id"]
+        return [], None
 
-    def write_all(self, entities):
-        with open(self.file_path, 'w') as file:
-            json.dump([entity.to_dict() for entity in entities], file)
+    def _replay_journal(self, entities, next_id=None):
+        # Повтор идемпотентен (add работает как upsert), поэтому журнал, оставшийся
+        # после сбоя между записью снимка и его очисткой, применяется безопасно.
+        entities = {entity.id: entity for entity in entities}
+        self._journal_records = 0
+        if not os.path.exists(self.journal_path):
+            return list(entities.values()), next_id
+        next_id = self._meta_next_id(entities.values(), next_id)
+        with open(self.journal_path, 'r') as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Недописанная последняя строка после сбоя.
+                    break
+                if record["op"] == "delete":
+                    entities.pop(record["id"], None)
+                else:
+                    entity = MyEntity.from_dict(record["entity"])
+                    entities[entity.id] = entity
+                    next_id = max(next_id, entity.id + 1)
+                self._journal_records += 1
+        return list(entities.values()), next_id
+
+    def _stat(self):
+        state = super()._stat()
+        if not self.journal:
+            return state
+        try:
+            stat = os.stat(self.journal_path)
+            return state, (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            return state, None
+
+    def _persist(self, changes):
+        if not self.journal:
+            self._write_snapshot()
+            return
+        lines = []
+        for op, entity_id, entity in changes:
+            record = {"op": op, "id": entity_id}
+            if entity is not None:
+                record["entity"] = entity.to_dict()
+            lines.append(json.dumps(record) + "\n")
+        with open(self.journal_path, 'a') as file:
+            file.writelines(lines)
+            file.flush()
+            os.fsync(file.fileno())
+        self._journal_records += len(lines)
+        if self._journal_records >= self.compact_threshold:
+            self._write_snapshot()
+
+    def compact(self):
+        """Свертка журнала: запись текущего состояния в снимок и очистка журнала."""
+        with self._lock(exclusive=True):
+            self._load()
+            self._write_snapshot()
+            self._version = self._bump_version()
+
+    def _write_snapshot(self):
+        self.write_all(self._all(), self._next_id)
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self._journal_records = 0
+        self._file_state = self._stat()
 
 class MyEntityRepYaml(MyEntityRepBase):
+    loader = YamlLoader
+    dumper = YamlDumper
+
     def read_all(self):
+        return self._read_data()[0]
+
+    def _read_data(self):
         if os.path.exists(self.file_path):
             with open(self.file_path, 'r') as file:
-                data = yaml.safe_load(file) or []
-            return [MyEntity.from_dict(item) for item in data]
-        return []
+                data = yaml.load(file, Loader=self.loader) or []
+            if isinstance(data, list):
+                return [MyEntity.from_dict(item) for item in data], None
+            return [MyEntity.from_dict(item) for item in data["entities"]], data["next_id"]
+        return [], None
 
-    def write_all(self, entities):
-        with open(self.file_path, 'w') as file:
-            yaml.dump([entity.to_dict() for entity in entities], file)
+    def write_all(self, entities, next_id=None):
+        data = {
+            "next_id": self._meta_next_id(entities, next_id),
+            "entities": [entity.to_dict() for entity in entities],
+        }
+        self._atomic_write(lambda file: yaml.dump(data, file, Dumper=self.dumper))
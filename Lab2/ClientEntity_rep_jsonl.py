@@ -0,0 +1,189 @@
+import json
+import os
+import struct
+from array import array
+
+from ClientEntity_rep_jsonANDyaml import MyEntity, MyEntityRepBase
+
+
+class MyEntityRepJsonLines(MyEntityRepBase):
+    """Репозиторий в формате JSON Lines: одна сущность на строку.
+
+    Рядом с файлом хранится индекс <file_path>.idx с байтовыми смещениями строк
+    и id сущностей, поэтому страница k читается seek'ом к нужной строке, а не
+    разбором всего файла, и память не растёт вместе с файлом (16 байт на запись
+    индекса). Добавление дописывает строку в конец файла и запись в индекс;
+    изменение и удаление переписывают файл целиком. Счётчик next_id хранится в
+    заголовке индекса; если индекс перестраивается, он берётся как max(id) + 1.
+    """
+
+    INDEX_MAGIC = b"JLIDX2"
+    INDEX_HEADER = struct.Struct("<6sqqq")
+
+    def __init__(self, file_path):
+        super().__init__(file_path)
+        self.index_path = file_path + ".idx"
+        self._offsets = None
+        self._ids = None
+        self._index_state = None
+
+    def iter_entities(self, start=0, count=None):
+        """Ленивый обход сущностей, начиная со строки с номером start."""
+        self._load_index()
+        start = max(start, 0)
+        if start >= len(self._offsets) or count == 0:
+            return
+        with open(self.file_path, 'rb') as file:
+            file.seek(self._offsets[start])
+            for line in file:
+                if not line.strip():
+                    continue
+                yield MyEntity.from_dict(json.loads(line))
+                if count is not None:
+                    count -= 1
+                    if not count:
+                        return
+
+    def read_all(self):
+        return list(self.iter_entities())
+
+    def write_all(self, entities, next_id=None):
+        offsets = array('q')
+        ids = array('q')
+
+        def dump(file):
+            for entity in entities:
+                offsets.append(file.tell())
+                ids.append(entity.id)
+                file.write(json.dumps(entity.to_dict()).encode() + b"\n")
+
+        self._atomic_write(dump, mode='wb')
+        self._offsets, self._ids = offsets, ids
+        self._next_id = self._meta_next_id(entities, next_id)
+        self._write_index(self._stat())
+
+    def _read_data(self):
+        entities = self.read_all()
+        # read_all() загружает индекс, а вместе с ним и next_id.
+        return entities, self._next_id
+
+    def get_by_id(self, entity_id):
+        with self._lock():
+            if self._changes:
+                return super().get_by_id(entity_id)
+            self._load_index()
+            try:
+                position = self._ids.index(entity_id)
+            except ValueError:
+                return None
+            return next(self.iter_entities(position, 1), None)
+
+    def get_k_n_short_list(self, k, n, sort_by=None):
+        with self._lock():
+            if self._changes or sort_by:
+                return super().get_k_n_short_list(k, n, sort_by)
+            if k < 1:
+                return []
+            return list(self.iter_entities((k - 1) * n, n))
+
+    def get_count(self):
+        with self._lock():
+            if self._changes:
+                return super().get_count()
+            self._load_index()
+            return len(self._offsets)
+
+    def add_entity(self, new_entity):
+        with self._lock(exclusive=True):
+            if self._changes or self._batch_depth:
+                return super().add_entity(new_entity)
+            self._load_index()
+            new_entity.id = self._next_id
+            self._next_id += 1
+            line = json.dumps(new_entity.to_dict()).encode() + b"\n"
+            with open(self.file_path, 'ab') as file:
+                offset = file.tell()
+                file.write(line)
+                file.flush()
+                os.fsync(file.fileno())
+            self._offsets.append(offset)
+            self._ids.append(new_entity.id)
+            if self._index_state is None:
+                self._write_index(self._stat())
+            else:
+                self._append_index(offset, new_entity.id, self._stat())
+            self._bump_version()
+            # Данные в памяти базового класса теперь устарели.
+            self._loaded = False
+
+    def flush(self):
+        with self._thread_lock:
+            super().flush()
+            # После перезаписи файла не держим все сущности в памяти.
+            if not self._changes:
+                self._entities = {}
+                self._order = []
+                self._loaded = False
+
+    def _load_index(self):
+        state = self._stat()
+        if self._offsets is not None and state == self._index_state:
+            return
+        if state is None:
+            self._offsets, self._ids, self._index_state = array('q'), array('q'), None
+            self._next_id = 1
+            return
+        if not self._read_index(state):
+            self._rebuild_index(state)
+
+    def _read_index(self, state):
+        try:
+            with open(self.index_path, 'rb') as file:
+                header = file.read(self.INDEX_HEADER.size)
+                magic, mtime_ns, size, next_id = self.INDEX_HEADER.unpack(header)
+                if magic != self.INDEX_MAGIC or (mtime_ns, size) != state:
+                    return False
+                pairs = array('q')
+                pairs.frombytes(file.read())
+        except (OSError, struct.error, ValueError):
+            return False
+        self._offsets, self._ids = pairs[0::2], pairs[1::2]
+        self._next_id = next_id
+        self._index_state = state
+        return True
+
+    def _rebuild_index(self, state):
+        offsets = array('q')
+        ids = array('q')
+        with open(self.file_path, 'rb') as file:
+            offset = 0
+            for line in file:
+                if line.strip():
+                    offsets.append(offset)
+                    ids.append(json.loads(line)['id'])
+                offset += len(line)
+        self._offsets, self._ids = offsets, ids
+        self._next_id = max(ids, default=0) + 1
+        self._write_index(state)
+
+    def _write_index(self, state):
+        pairs = array('q', [0]) * (2 * len(self._offsets))
+        pairs[0::2] = self._offsets
+        pairs[1::2] = self._ids
+
+        def dump(file):
+            file.write(self.INDEX_HEADER.pack(self.INDEX_MAGIC, *state, self._next_id))
+            file.write(pairs.tobytes())
+
+        self._atomic_write(dump, path=self.index_path, mode='wb')
+        self._index_state = state
+
+    def _append_index(self, offset, entity_id, state):
+        # Сначала запись, затем заголовок: если процесс упадёт между ними,
+        # заголовок не совпадёт с файлом данных и индекс будет перестроен.
+        with open(self.index_path, 'r+b') as file:
+            file.seek(0, os.SEEK_END)
+            file.write(array('q', [offset, entity_id]).tobytes())
+            file.seek(0)
+            file.write(self.INDEX_HEADER.pack(self.INDEX_MAGIC, *state, self._next_id))
+        self._index_state = state
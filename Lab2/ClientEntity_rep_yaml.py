@@ -1,7 +1,15 @@
 import yaml
 import os
 
+# Ускоренные загрузчик/дампер LibYAML, если PyYAML собран с ними.
+try:
+    from yaml import CSafeDumper as YamlDumper, CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeDumper as YamlDumper, SafeLoader as YamlLoader
+
 class MyEntity:
+    __slots__ = ("id", "name")
+
     def __init__(self, id, name):
         self.id = id
         self.name = name
@@ -14,19 +22,22 @@ class MyEntity:
         return cls(id=data['id'], name=data['name'])
 
 class MyEntityRepYaml:
+    loader = YamlLoader
+    dumper = YamlDumper
+
     def __init__(self, file_path):
         self.file_path = file_path
 
     def read_all(self):
         if os.path.exists(self.file_path):
             with open(self.file_path, 'r') as file:
-                data = yaml.safe_load(file) or []
+                data = yaml.load(file, Loader=self.loader) or []
             return [MyEntity.from_dict(item) for item in data]
         return []
 
     def write_all(self, entities):
         with open(self.file_path, 'w') as file:
-            yaml.dump([entity.to_dict() for entity in entities], file)
+            yaml.dump([entity.to_dict() for entity in entities], file, Dumper=self.dumper)
 
     def get_by_id(self, entity_id):
         entities = self.read_all()
@@ -1,6 +1,11 @@
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 import mysql.connector
-from functools import wraps
+import sys
+import threading
+import time
+from connection_pool import ConnectionPool
+from query_builder import CountCache, QueryBuilder
 
 class ClientRepositoryInterface(ABC):
     @abstractmethod
@@ -23,89 +28,141 @@ class ClientRepositoryInterface(ABC):
     def delete_client_by_id(self, client_id):
         pass
 
-class DatabaseConnectionSingleton:
-    _instance = None
-
-    def __new__(cls, db_config):
-        if cls._instance is None:
-            cls._instance = super(DatabaseConnectionSingleton, cls).__new__(cls)
-            cls._instance._initialize(db_config)
-        return cls._instance
-
-    def _initialize(self, db_config):
-        self.connection = mysql.connector.connect(**db_config)
-        self.cursor = self.connection.cursor(dictionary=True)
-
-    def execute_query(self, query, params=None):
-        self.cursor.execute(query, params)
-        return self.cursor.fetchall()
-
-    def execute_update(self, query, params=None):
-        self.cursor.execute(query, params)
-        self.connection.commit()
-        return self.cursor.lastrowid
-
-    def __del__(self):
-        if self.cursor:
-            self.cursor.close()
-        if self.connection:
-            self.connection.close()
-
-
-def with_filter_and_sort(func):
-    @wraps(func)
-    def wrapper(self, *args, **kwargs):
-        filters = kwargs.get('filters', {})
-        sort_by = kwargs.get('sort_by')
-        
-        filter_conditions = []
-        filter_values = []
-        for field, value in filters.items():
-            filter_conditions.append(f"{field} = %s")
-            filter_values.append(value)
-        where_clause = f"WHERE {' AND '.join(filter_conditions)}" if filter_conditions else ""
-        
-        order_clause = f"ORDER BY {sort_by}" if sort_by else ""
-        
-        return func(self, *args, where_clause=where_clause, filter_values=filter_values, order_clause=order_clause)
-    
-    return wrapper
+    def get_by_id(self, client_id):
+        raise NotImplementedError("Метод должен быть реализован в подклассе.")
+
+    def get_page_with_total(self, k, n, filters=None, sort_by=None):
+        """Страница и общее число записей; реализации могут получать их одним запросом."""
+        return (self.get_k_n_short_list(k, n, filters=filters, sort_by=sort_by),
+                self.get_count(filters=filters))
 
 class ClientEntityRepDB:
-    def __init__(self, db_config):
-        self.db = DatabaseConnectionSingleton(db_config)
-
-    @with_filter_and_sort
-    def get_k_n_short_list(self, k, n, where_clause="", filter_values=None, order_clause=""):
-        filter_values = filter_values or []
-        offset = (k - 1) * n
-        query = f"SELECT * FROM client {where_clause} {order_clause} LIMIT %s OFFSET %s"
-        return self.db.execute_query(query, filter_values + [n, offset])
-
-    @with_filter_and_sort
-    def get_count(self, where_clause="", filter_values=None, order_clause=""):
-        filter_values = filter_values or []
-        query = f"SELECT COUNT(*) AS count FROM client {where_clause}"
-        result = self.db.execute_query(query, filter_values)
-        return result[0]['count'] if result else 0
+    # Колонки, по которым разрешены фильтрация и сортировка.
+    COLUMNS = ('id', 'name', 'email', 'phone')
+    # Колонки с отдельным индексом; набор постоянный и создаётся один раз.
+    INDEXES = ('name', 'email', 'phone')
+
+    def __init__(self, db_config, pool=None, pool_size=8):
+        # Пул можно передать готовым, чтобы несколько репозиториев делили соединения.
+        self.db = pool or ConnectionPool(lambda: mysql.connector.connect(**db_config),
+                                         max_size=pool_size, prepared_statements=True)
+        self.query = QueryBuilder('client', self.COLUMNS)
+        self.counts = CountCache()
+
+    def get_by_id(self, client_id):
+        rows = self.db.execute_prepared("SELECT * FROM client WHERE id = %s", (client_id,))
+        return rows[0] if rows else None
+
+    def get_k_n_short_list(self, k, n, filters=None, sort_by=None):
+        """Страница k по n клиентов; filters и sort_by - в формате QueryBuilder."""
+        query, params = self.query.select(filters, sort_by, limit=n, offset=(k - 1) * n)
+        return self.db.execute_prepared(query, params)
+
+    def get_count(self, filters=None):
+        query, params = self.query.count(filters)
+        key = self.counts.key(query, params)
+        count = self.counts.get(key)
+        if count is None:
+            generation = self.counts.generation
+            result = self.db.execute_prepared(query, params)
+            count = result[0]['count'] if result else 0
+            self.counts.put(key, count, generation)
+        return count
+
+    def get_page_with_total(self, k, n, filters=None, sort_by=None):
+        """Страница k по n клиентов и общее число клиентов под фильтром.
+
+        Если число уже есть в кэше, выполняется только выборка страницы; иначе
+        оно приходит в том же запросе (COUNT(*) OVER ()). Возвращает (rows, total).
+        """
+        key = self.counts.key(*self.query.count(filters))
+        total = self.counts.get(key)
+        if total is not None:
+            return self.get_k_n_short_list(k, n, filters, sort_by), total
+
+        generation = self.counts.generation
+        query, params = self.query.select(filters, sort_by, limit=n, offset=(k - 1) * n, with_total=True)
+        rows = self.db.execute_prepared(query, params)
+        if not rows:
+            # Пустая страница (например, за концом списка) числа не несёт.
+            return rows, self.get_count(filters)
+        total = rows[0]['total_count']
+        for row in rows:
+            del row['total_count']
+        self.counts.put(key, total, generation)
+        return rows, total
+
+    def get_page_after(self, last_sort_key=None, last_id=None, n=10, filters=None, sort_by=None):
+        """Страница из n клиентов, следующих за записью (last_sort_key, last_id).
+
+        Keyset-пагинация вместо LIMIT/OFFSET: выборка продолжается с последней
+        записи предыдущей страницы по индексу, поэтому глубокие страницы не
+        медленнее первой. Для первой страницы last_id=None. filters - в формате
+        QueryBuilder, sort_by - одна колонка сортировки (по умолчанию id).
+        NULL идут первыми, как в ORDER BY; для строки с NULL last_sort_key=None.
+        """
+        sort_by = self.query.check_column(sort_by or 'id')
+
+        conditions, values = self.query.conditions(filters)
+        if last_id is not None:
+            if sort_by == 'id':
+                conditions.append("id > %s")
+                values.append(last_id)
+            elif last_sort_key is None:
+                # NULL сортируются первыми: сначала оставшиеся строки с NULL, затем все прочие.
+                conditions.append(f"({sort_by} IS NULL AND id > %s OR {sort_by} IS NOT NULL)")
+                values.append(last_id)
+            else:
+                # Отдельное условие ">=" позволяет искать начало страницы по индексу.
+                conditions.append(f"{sort_by} >= %s AND ({sort_by} > %s OR id > %s)")
+                values += [last_sort_key, last_sort_key, last_id]
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"SELECT * FROM client {where_clause} {self.query.order_by(sort_by)} LIMIT %s"
+        return self.db.execute_prepared(query, values + [n])
+
+    def create_indexes(self):
+        """Создание индексов из INDEXES, которых ещё нет; вызывается один раз при настройке базы."""
+        # Первичный ключ InnoDB и так входит в каждый вторичный индекс, поэтому
+        # индекс по колонке подходит и для сортировки (колонка, id).
+        existing = {row['index_name'] for row in self.db.execute_query(
+            "SELECT DISTINCT index_name AS index_name FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = 'client'")}
+        for column in self.INDEXES:
+            name = f"idx_client_{column}"
+            if name in existing:
+                continue
+            try:
+                self.db.execute_update(f"CREATE INDEX {name} ON client ({column})")
+            except mysql.connector.Error as e:
+                # Индекс мог успеть создать другой процесс.
+                if e.errno != 1061:
+                    raise
 
     def add_client(self, client_data):
         query = "INSERT INTO client (name, email, phone) VALUES (%s, %s, %s)"
         params = (client_data['name'], client_data['email'], client_data['phone'])
-        return self.db.execute_update(query, params)
+        client_id = self.db.execute_update(query, params)
+        self.counts.invalidate()
+        return client_id
 
     def update_client_by_id(self, client_id, client_data):
         query = "UPDATE client SET name = %s, email = %s, phone = %s WHERE id = %s"
         params = (client_data['name'], client_data['email'], client_data['phone'], client_id)
         self.db.execute_update(query, params)
+        # Изменённые поля могут вывести клиента из-под фильтра или под него.
+        self.counts.invalidate()
 
     def delete_client_by_id(self, client_id):
         query = "DELETE FROM client WHERE id = %s"
         self.db.execute_update(query, (client_id,))
+        self.counts.invalidate()
 
 class ClientEntityRepAdapter(ClientRepositoryInterface):
-    def __init__(self, db_config):
-        self.client_db = ClientEntityRepDB(db_config)
+    def __init__(self, db_config, pool=None, pool_size=8):
+        self.client_db = ClientEntityRepDB(db_config, pool, pool_size)
+
+    def get_by_id(self, client_id):
+        return self.client_db.get_by_id(client_id)
 
     def get_k_n_short_list(self, k, n, **kwargs):
         return self.client_db.get_k_n_short_list(k, n, **kwargs)
@@ -113,6 +170,15 @@ class ClientEntityRepAdapter(ClientRepositoryInterface):
     def get_count(self, **kwargs):
         return self.client_db.get_count(**kwargs)
 
+    def get_page_with_total(self, k, n, filters=None, sort_by=None):
+        return self.client_db.get_page_with_total(k, n, filters, sort_by)
+
+    def get_page_after(self, last_sort_key=None, last_id=None, n=10, filters=None, sort_by=None):
+        return self.client_db.get_page_after(last_sort_key, last_id, n, filters, sort_by)
+
+    def create_indexes(self):
+        self.client_db.create_indexes()
+
     def add_client(self, client_data):
         return self.client_db.add_client(client_data)
 
@@ -122,6 +188,220 @@ class ClientEntityRepAdapter(ClientRepositoryInterface):
     def delete_client_by_id(self, client_id):
         self.client_db.delete_client_by_id(client_id)
 
+class CachingClientRepository(ClientRepositoryInterface):
+    """Кэширующая обёртка над любой реализацией ClientRepositoryInterface.
+
+    Кэшируются страницы (get_k_n_short_list), количества (get_count) и
+    клиенты по id. Записи живут не дольше ttl секунд, вытесняются по LRU при
+    превышении max_entries или примерной оценки памяти max_bytes.
+
+    Изменения сбрасывают только затронутое:
+        add_client    - страницы и количества (новый клиент может попасть в любой список);
+        delete_client - запись клиента, страницы и количества;
+        update_client - запись клиента, страницы с ним, а также страницы и
+                        количества, чьи фильтры или сортировка используют
+                        изменённые поля.
+    Возвращаются копии строк, чтобы вызывающий код не испортил кэш.
+
+    Из прочих методов реализации доступны только перечисленные в PASSTHROUGH
+    (они лишь читают данные и вызываются без кэша): изменение в обход обёртки
+    оставило бы в кэше устаревшие страницы.
+    """
+
+    PASSTHROUGH = ('get_page_after', 'export_iter')
+
+    def __init__(self, repository, ttl=60, max_entries=1024, max_bytes=16 * 1024 * 1024):
+        self.repository = repository
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_by_id(self, client_id):
+        key = ('id', client_id)
+        found, row = self._get(key)
+        if not found:
+            generation = self._generation
+            row = self.repository.get_by_id(client_id)
+            self._put(key, row, generation, (), (client_id,))
+        return dict(row) if row is not None else None
+
+    def get_k_n_short_list(self, k, n, **kwargs):
+        kwargs = self._normalize(kwargs)
+        key = ('list', k, n, self._freeze(kwargs))
+        found, rows = self._get(key)
+        if not found:
+            rows = self._load_list(key, k, n, kwargs)
+        return [dict(row) for row in rows]
+
+    def get_count(self, **kwargs):
+        kwargs = self._normalize(kwargs)
+        key = ('count', self._freeze(kwargs))
+        found, count = self._get(key)
+        if not found:
+            count = self._load_count(key, kwargs)
+        return count
+
+    def get_page_with_total(self, k, n, filters=None, sort_by=None):
+        list_kwargs = self._normalize({'filters': filters, 'sort_by': sort_by})
+        count_kwargs = self._normalize({'filters': filters})
+        list_key = ('list', k, n, self._freeze(list_kwargs))
+        count_key = ('count', self._freeze(count_kwargs))
+        found_rows, rows = self._get(list_key)
+        found_total, total = self._get(count_key)
+        if not found_rows and not found_total:
+            # Ничего нет в кэше: реализация может вернуть оба значения одним запросом.
+            generation = self._generation
+            rows, total = self.repository.get_page_with_total(k, n, filters, sort_by)
+            self._put(list_key, rows, generation, self._fields(list_kwargs), self._ids(rows))
+            self._put(count_key, total, generation, self._fields(count_kwargs))
+        elif not found_rows:
+            rows = self._load_list(list_key, k, n, list_kwargs)
+        elif not found_total:
+            total = self._load_count(count_key, count_kwargs)
+        return [dict(row) for row in rows], total
+
+    def add_client(self, client_data):
+        client_id = self.repository.add_client(client_data)
+        # Сохранённое «клиента нет» для нового id тоже устарело.
+        self._invalidate(lambda key, entry: key[0] != 'id' or entry['value'] is None)
+        return client_id
+
+    def update_client_by_id(self, client_id, client_data):
+        old = self._known_row(client_id)
+        self.repository.update_client_by_id(client_id, client_data)
+        changed = {field for field, value in client_data.items() if old is None or old.get(field) != value}
+        self._invalidate(lambda key, entry: client_id in entry['ids'] or bool(changed & entry['fields']))
+
+    def delete_client_by_id(self, client_id):
+        self.repository.delete_client_by_id(client_id)
+        self._invalidate(lambda key, entry: key[0] != 'id' or client_id in entry['ids'])
+
+    def clear(self):
+        self._invalidate(lambda key, entry: True)
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def __getattr__(self, name):
+        if name in self.PASSTHROUGH:
+            return getattr(self.repository, name)
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry['stored'] > self.ttl:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry['value']
+
+    def _load_list(self, key, k, n, kwargs):
+        generation = self._generation
+        rows = self.repository.get_k_n_short_list(k, n, **kwargs)
+        self._put(key, rows, generation, self._fields(kwargs), self._ids(rows))
+        return rows
+
+    def _load_count(self, key, kwargs):
+        generation = self._generation
+        count = self.repository.get_count(**kwargs)
+        self._put(key, count, generation, self._fields(kwargs))
+        return count
+
+    def _put(self, key, value, generation, fields, ids=()):
+        size = self._estimate_size(value)
+        with self._lock:
+            # Значение, прочитанное до изменения, уже могло устареть.
+            if generation != self._generation or size > self.max_bytes:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = {'value': value, 'stored': time.monotonic(), 'size': size,
+                                  'fields': set(fields), 'ids': set(ids)}
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _invalidate(self, predicate):
+        with self._lock:
+            self._generation += 1
+            for key in [key for key, entry in self._entries.items() if predicate(key, entry)]:
+                self._remove(key)
+
+    def _remove(self, key):
+        self._bytes -= self._entries.pop(key)['size']
+
+    def _known_row(self, client_id):
+        """Текущие данные клиента, если они есть в кэше, - чтобы понять, какие поля меняются."""
+        with self._lock:
+            for entry in self._entries.values():
+                if client_id not in entry['ids']:
+                    continue
+                value = entry['value']
+                rows = value if isinstance(value, list) else [value]
+                for row in rows:
+                    if row is not None and row.get('id') == client_id:
+                        return row
+        return None
+
+    @staticmethod
+    def _ids(rows):
+        return {row.get('id') for row in rows}
+
+    @staticmethod
+    def _fields(kwargs):
+        """Поля, от которых зависит результат: колонки фильтров и сортировки."""
+        fields = set(kwargs.get('filters') or ())
+        sort_by = kwargs.get('sort_by') or ()
+        for field in [sort_by] if isinstance(sort_by, str) else sort_by:
+            fields.add(field.lstrip('-'))
+        return fields
+
+    @staticmethod
+    def _normalize(kwargs):
+        # filters=None и отсутствие filters - один и тот же запрос и один ключ кэша.
+        return {name: value for name, value in kwargs.items() if value}
+
+    @classmethod
+    def _freeze(cls, value):
+        if isinstance(value, dict):
+            return tuple(sorted((key, cls._freeze(item)) for key, item in value.items()))
+        if isinstance(value, (list, tuple)):
+            return tuple(cls._freeze(item) for item in value)
+        if isinstance(value, (set, frozenset)):
+            return frozenset(cls._freeze(item) for item in value)
+        return value
+
+    @classmethod
+    def _estimate_size(cls, value):
+        size = sys.getsizeof(value)
+        if isinstance(value, dict):
+            size += sum(cls._estimate_size(item) for item in value.values())
+        elif isinstance(value, (list, tuple)):
+            size += sum(cls._estimate_size(item) for item in value)
+        return size
+
 db_config = {
     'host': 'localhost',
     'user': 'username',
@@ -129,10 +409,13 @@ db_config = {
     'database': 'database_name'
 }
 
-client_repository = ClientEntityRepAdapter(db_config)
+client_adapter = ClientEntityRepAdapter(db_config)
+client_adapter.create_indexes()
+client_repository = CachingClientRepository(client_adapter)
 
 clients = client_repository.get_k_n_short_list(1, 10, filters={'name': 'Alice'}, sort_by='email')
 print("Клиенты:", clients)
 
 count = client_repository.get_count(filters={'name': 'Alice'})
 print("Количество клиентов:", count)
+print("Статистика кэша:", client_repository.stats())
@@ -0,0 +1,86 @@
+"""Сравнение памяти, занимаемой сущностями с __slots__ и без них.
+
+Замеряется средний прирост памяти (tracemalloc) на один объект MyEntity из
+Lab2 и ClientBase/Client/PledgeItem из lab1/2_EncapsClient. Варианты «до»
+получаются из тех же исходников с вырезанными объявлениями __slots__, поэтому
+отличаются от текущих классов только способом хранения атрибутов.
+
+Пример:
+    python benchmark_memory.py --count 200000
+"""
+import argparse
+import contextlib
+import gc
+import io
+import os
+import tracemalloc
+
+from ClientEntity_rep_jsonANDyaml import MyEntity
+
+LAB1_MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lab1", "2_EncapsClient", "main.py")
+
+
+def load_module(path, keep_slots=True):
+    """Исполнение исходника модуля; при keep_slots=False без строк с __slots__."""
+    with open(path, encoding="utf-8") as file:
+        source = file.read()
+    if not keep_slots:
+        source = "\n".join(line for line in source.splitlines() if "__slots__ =" not in line)
+    namespace = {"__name__": "benchmark_memory_target"}
+    # main.py при импорте печатает пример использования.
+    with contextlib.redirect_stdout(io.StringIO()):
+        exec(compile(source, path, "exec"), namespace)
+    return namespace
+
+
+def legacy_entity_class():
+    namespace = load_module(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                         "ClientEntity_rep_jsonANDyaml.py"), keep_slots=False)
+    return namespace["MyEntity"]
+
+
+def bytes_per_object(factory, count):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [factory(i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # Сам список не относится к объектам.
+    size = after - before - objects.__sizeof__()
+    del objects
+    return size / count
+
+
+def factories(lab1):
+    # Строки общие для всех объектов, чтобы мерить только сами экземпляры.
+    return {
+        "MyEntity": lambda i: lab1["MyEntity"](i, "Клиент"),
+        "ClientBase": lambda i: lab1["ClientBase"]("Ivanov", "Ivan", "Ivanovich", "Main St", "+61234567890"),
+        "Client": lambda i: lab1["Client"]("Ivanov", "Ivan", "Ivanovich", "Main St", "+61234567890"),
+        "PledgeItem": lambda i: lab1["PledgeItem"]("Watch", 10000, 5000, "2024-12-01"),
+    }
+
+
+def run(count):
+    before = load_module(LAB1_MAIN, keep_slots=False)
+    before["MyEntity"] = legacy_entity_class()
+    after = load_module(LAB1_MAIN)
+    after["MyEntity"] = MyEntity
+
+    print(f"{'class':<12} {'before, B':>10} {'after, B':>10} {'saved':>8}")
+    for (name, old), new in zip(factories(before).items(), factories(after).values()):
+        old_size = bytes_per_object(old, count)
+        new_size = bytes_per_object(new, count)
+        print(f"{name:<12} {old_size:>10.1f} {new_size:>10.1f} {1 - new_size / old_size:>8.0%}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Память на объект сущностей до и после __slots__")
+    parser.add_argument("--count", type=int, default=100000, help="сколько объектов создать")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.count)
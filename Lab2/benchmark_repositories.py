@@ -0,0 +1,67 @@
+"""Сравнение времени загрузки и записи JSON- и YAML-репозиториев.
+
+Для каждого размера файла замеряются write_all и read_all у MyEntityRepJson,
+MyEntityRepYaml с C-загрузчиком LibYAML (если он доступен) и MyEntityRepYaml
+с чистым Python.
+
+Пример:
+    python benchmark_repositories.py --sizes 1000 10000 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import yaml
+
+from ClientEntity_rep_jsonANDyaml import MyEntity, MyEntityRepJson, MyEntityRepYaml
+
+
+class PurePythonYamlRep(MyEntityRepYaml):
+    loader = yaml.SafeLoader
+    dumper = yaml.SafeDumper
+
+
+def repositories():
+    reps = [("json", MyEntityRepJson, ".json")]
+    if MyEntityRepYaml.loader is not yaml.SafeLoader:
+        reps.append(("yaml (LibYAML)", MyEntityRepYaml, ".yaml"))
+    else:
+        print("PyYAML собран без LibYAML: C-загрузчик недоступен.")
+    reps.append(("yaml (pure)", PurePythonYamlRep, ".yaml"))
+    return reps
+
+
+def best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(sizes, repeat):
+    print(f"{'format':<16} {'entities':>9} {'dump, s':>9} {'load, s':>9} {'file, KB':>9}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            entities = [MyEntity(i, f"Клиент номер {i}") for i in range(1, size + 1)]
+            for name, rep_class, suffix in repositories():
+                rep = rep_class(os.path.join(workdir, f"entities-{size}{suffix}"))
+                dump_time = best_of(repeat, lambda: rep.write_all(entities))
+                load_time = best_of(repeat, rep.read_all)
+                file_size = os.path.getsize(rep.file_path) / 1024
+                print(f"{name:<16} {size:>9} {dump_time:>9.3f} {load_time:>9.3f} {file_size:>9.0f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Бенчмарк JSON/YAML-репозиториев Lab2")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=3, help="лучший результат из N прогонов")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.sizes, args.repeat)
@@ -0,0 +1,217 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+
+class ConnectionPool:
+    """Потокобезопасный пул соединений с БД для репозиториев Lab2.
+
+    Драйвер не зашит: connect - функция без аргументов, создающая соединение
+    DB-API (mysql.connector.connect(**config), sqlite3.connect(...) и т. п.),
+    поэтому пул проверяется и на локальной SQLite. Каждый вызов execute_*
+    берёт соединение из пула и открывает на время запроса свой курсор.
+
+    Соединение, простоявшее дольше ping_interval, перед выдачей проверяется
+    запросом SELECT 1; разорванное соединение заменяется новым, а запрос на
+    чтение, упавший из-за разрыва, повторяется один раз на свежем соединении.
+    После обнаруженного разрыва (например, перезапуска сервера) проверяются
+    все соединения, вернувшиеся в пул раньше него.
+    """
+
+    # Сколько подготовленных запросов держать на одном соединении.
+    PREPARED_CACHE_SIZE = 64
+
+    def __init__(self, connect, min_size=1, max_size=8, checkout_timeout=30, idle_timeout=300,
+                 ping_interval=30, prepared_statements=False):
+        if not 0 <= min_size <= max_size:
+            raise ValueError("Pool size must satisfy 0 <= min_size <= max_size")
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval
+        self.prepared_statements = prepared_statements
+        self._idle = deque()
+        self._prepared = {}
+        self._size = 0
+        self._broken_at = 0.0
+        self._closed = False
+        self._condition = threading.Condition()
+        for _ in range(min_size):
+            self._size += 1
+            self._idle.append((self.connect(), time.monotonic()))
+
+    def acquire(self):
+        """Выдача соединения из пула; при исчерпании пула ждёт освобождения."""
+        deadline = time.monotonic() + self.checkout_timeout
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                self._close_expired()
+                if self._idle:
+                    conn, released = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn = released = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No free connection within {self.checkout_timeout} s")
+                self._condition.wait(remaining)
+
+        # Проверка и создание соединения - вне блокировки пула.
+        if conn is not None:
+            fresh = released > self._broken_at and time.monotonic() - released < self.ping_interval
+            if fresh or self._is_healthy(conn):
+                return conn
+            self._close_connection(conn)
+            with self._condition:
+                self._broken_at = time.monotonic()
+        try:
+            return self.connect()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+    def release(self, conn, broken=False):
+        """Возврат соединения в пул; незавершённая транзакция откатывается."""
+        if not broken and getattr(conn, 'in_transaction', False):
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+        if broken or self._closed:
+            self._close_connection(conn)
+            with self._condition:
+                self._size -= 1
+                if broken:
+                    self._broken_at = time.monotonic()
+                self._condition.notify()
+            return
+        with self._condition:
+            self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn
+        except Exception:
+            broken = not self._is_healthy(conn)
+            raise
+        finally:
+            self.release(conn, broken)
+
+    def execute_query(self, query, params=None):
+        """SELECT-запрос; строки возвращаются словарями {колонка: значение}."""
+        return self._retry(lambda conn: self._fetch(conn.cursor(), query, params, close=True))
+
+    def execute_prepared(self, query, params=None):
+        """То же, что execute_query, но через подготовленный на сервере запрос.
+
+        Подготовленные курсоры хранятся при соединении (по одному на текст SQL).
+        Если пул создан с prepared_statements=False, запрос выполняется обычно.
+        """
+        if not self.prepared_statements:
+            return self.execute_query(query, params)
+        return self._retry(lambda conn: self._fetch(self._prepared_cursor(conn, query), query, params))
+
+    def execute_update(self, query, params=None):
+        """Изменяющий запрос с фиксацией; возвращает lastrowid."""
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(query, params or ())
+                conn.commit()
+                return cursor.lastrowid
+            finally:
+                cursor.close()
+
+    def close(self):
+        """Закрытие всех простаивающих соединений; выданные закроются при возврате."""
+        with self._condition:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for conn in idle:
+            self._close_connection(conn)
+
+    def stats(self):
+        return {"size": self._size, "idle": len(self._idle), "min_size": self.min_size, "max_size": self.max_size}
+
+    def _retry(self, run):
+        # Чтение безопасно повторить, если соединение оборвалось во время запроса.
+        for attempt in (1, 2):
+            conn = self.acquire()
+            try:
+                result = run(conn)
+            except Exception:
+                broken = not self._is_healthy(conn)
+                self.release(conn, broken)
+                if broken and attempt == 1:
+                    continue
+                raise
+            self.release(conn)
+            return result
+
+    @staticmethod
+    def _fetch(cursor, query, params, close=False):
+        try:
+            cursor.execute(query, params or ())
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        finally:
+            if close:
+                cursor.close()
+
+    def _prepared_cursor(self, conn, query):
+        cursors = self._prepared.setdefault(id(conn), OrderedDict())
+        cursor = cursors.pop(query, None)
+        if cursor is None:
+            cursor = conn.cursor(prepared=True)
+            if len(cursors) >= self.PREPARED_CACHE_SIZE:
+                cursors.popitem(last=False)[1].close()
+        cursors[query] = cursor
+        return cursor
+
+    def _close_expired(self):
+        now = time.monotonic()
+        while (self._idle and self._size > self.min_size
+               and now - self._idle[0][1] > self.idle_timeout):
+            conn, _ = self._idle.popleft()
+            self._size -= 1
+            self._close_connection(conn)
+
+    def _close_connection(self, conn):
+        for cursor in self._prepared.pop(id(conn), {}).values():
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _is_healthy(conn):
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
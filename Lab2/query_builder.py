@@ -0,0 +1,208 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+
+class QueryBuilder:
+    """Построитель SELECT/COUNT-запросов с фильтрами и сортировкой.
+
+    Имена колонок берутся только из белого списка columns, значения всегда
+    передаются параметрами. Фильтры - словарь {колонка: условие}:
+        значение                  - равенство (None - IS NULL)
+        список/кортеж/множество   - IN
+        словарь {оператор: знач.} - операторы =, !=, <, <=, >, >=, in, prefix
+    ('!=': None - IS NOT NULL). prefix по умолчанию - LIKE 'Iv%' ESCAPE '!'
+    (MySQL использует для него индекс при любой сортировке строк). При
+    range_prefix=True он превращается в диапазон (col >= 'Iv' AND col < 'Iw'):
+    так индекс использует SQLite, но верно это только для двоичного сравнения
+    строк (BINARY), а не для регистронезависимых сортировок MySQL.
+
+    sort_by - колонка или список колонок, '-' перед именем - по убыванию;
+    последним ключом всегда добавляется id, чтобы порядок был однозначным.
+
+    Текст запроса зависит только от «формы» фильтров (колонки и операторы,
+    отсортированные по имени), а списки IN дополняются до степени двойки,
+    поэтому одинаковые по смыслу запросы дают один и тот же SQL: его кэширует
+    сам построитель, а драйвер и сервер переиспользуют подготовленный план.
+    """
+
+    OPERATORS = {'=': '=', '!=': '<>', '<': '<', '<=': '<=', '>': '>', '>=': '>='}
+
+    def __init__(self, table, columns, placeholder='%s', cache_size=256, range_prefix=False):
+        self.table = table
+        self.columns = tuple(columns)
+        self.placeholder = placeholder
+        self.range_prefix = range_prefix
+        self._where_sql = lru_cache(maxsize=cache_size)(self._build_where)
+        self._order_sql = lru_cache(maxsize=cache_size)(self._build_order)
+        self._select_sql = lru_cache(maxsize=cache_size)(self._build_select)
+
+    def check_column(self, field):
+        if field not in self.columns:
+            raise ValueError(f"Unknown column: {field}")
+        return field
+
+    def select(self, filters=None, sort_by=None, limit=None, offset=None, with_total=False):
+        """Запрос SELECT * и его параметры.
+
+        with_total=True добавляет колонку total_count - число всех строк под
+        фильтром (оконная функция COUNT(*) OVER (), MySQL 8+ и SQLite 3.25+).
+        """
+        shape, params = self._normalize_filters(filters)
+        order = self._normalize_sort(sort_by)
+        query = self._select_sql(shape, order, limit is not None, offset is not None, with_total)
+        params += [value for value in (limit, offset) if value is not None]
+        return query, params
+
+    def count(self, filters=None):
+        """Запрос COUNT(*) с теми же фильтрами и его параметры."""
+        shape, params = self._normalize_filters(filters)
+        return f"SELECT COUNT(*) AS count FROM {self.table} {self._where_sql(shape)}", params
+
+    def conditions(self, filters=None):
+        """Условия WHERE списком (без слова WHERE) и параметры - для дополнения своими."""
+        shape, params = self._normalize_filters(filters)
+        where = self._where_sql(shape)
+        return ([where[len("WHERE "):]] if where else []), params
+
+    def order_by(self, sort_by=None):
+        return self._order_sql(self._normalize_sort(sort_by))
+
+    def _normalize_filters(self, filters):
+        items = []
+        for field, condition in (filters or {}).items():
+            self.check_column(field)
+            if isinstance(condition, dict):
+                items.extend((field, op, value) for op, value in condition.items())
+            elif isinstance(condition, (list, tuple, set, frozenset)):
+                items.append((field, 'in', condition))
+            else:
+                items.append((field, '=', condition))
+        items.sort(key=lambda item: (item[0], item[1]))
+
+        shape = []
+        params = []
+        for field, op, value in items:
+            if op == '=' and value is None:
+                shape.append((field, 'null', 0))
+            elif op == '!=' and value is None:
+                shape.append((field, 'notnull', 0))
+            elif op in self.OPERATORS:
+                shape.append((field, op, 1))
+                params.append(value)
+            elif op == 'in':
+                values = list(value)
+                if values:
+                    size = 1 << (len(values) - 1).bit_length()
+                    values += values[-1:] * (size - len(values))
+                shape.append((field, 'in', len(values)))
+                params.extend(values)
+            elif op == 'prefix':
+                if not value:
+                    continue
+                if self.range_prefix:
+                    shape.append((field, 'prefix', 2))
+                    params += [value, value[:-1] + chr(ord(value[-1]) + 1)]
+                else:
+                    shape.append((field, 'like', 1))
+                    params.append(self._escape_like(value) + '%')
+            else:
+                raise ValueError(f"Unknown filter operator: {op}")
+        return tuple(shape), params
+
+    @staticmethod
+    def _escape_like(value):
+        return value.replace('!', '!!').replace('%', '!%').replace('_', '!_')
+
+    def _normalize_sort(self, sort_by):
+        if not sort_by:
+            sort_by = []
+        elif isinstance(sort_by, str):
+            sort_by = [sort_by]
+        order = []
+        for item in sort_by:
+            descending = item.startswith('-')
+            field = self.check_column(item.lstrip('-'))
+            order.append((field, descending))
+        if not any(field == 'id' for field, _ in order):
+            order.append(('id', False))
+        return tuple(order)
+
+    def _build_where(self, shape):
+        ph = self.placeholder
+        conditions = []
+        for field, op, size in shape:
+            if op == 'null':
+                conditions.append(f"{field} IS NULL")
+            elif op == 'notnull':
+                conditions.append(f"{field} IS NOT NULL")
+            elif op == 'in':
+                conditions.append(f"{field} IN ({', '.join([ph] * size)})" if size else "1 = 0")
+            elif op == 'prefix':
+                conditions.append(f"{field} >= {ph} AND {field} < {ph}")
+            elif op == 'like':
+                conditions.append(f"{field} LIKE {ph} ESCAPE '!'")
+            else:
+                conditions.append(f"{field} {self.OPERATORS[op]} {ph}")
+        return f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    @staticmethod
+    def _build_order(order):
+        return "ORDER BY " + ", ".join(f"{field} DESC" if descending else field for field, descending in order)
+
+    def _build_select(self, shape, order, has_limit, has_offset, with_total):
+        columns = "*, COUNT(*) OVER () AS total_count" if with_total else "*"
+        parts = [f"SELECT {columns} FROM {self.table}", self._where_sql(shape), self._order_sql(order)]
+        if has_limit:
+            parts.append(f"LIMIT {self.placeholder}")
+        if has_offset:
+            parts.append(f"OFFSET {self.placeholder}")
+        return " ".join(part for part in parts if part)
+
+
+class CountCache:
+    """Кэш результатов COUNT(*) по тексту запроса и параметрам.
+
+    Любое изменение данных сбрасывает кэш целиком (invalidate). Значение,
+    посчитанное до сброса, не сохраняется: put() сверяет номер поколения,
+    взятый перед запросом. ttl ограничивает время жизни записи на случай
+    изменений из других процессов.
+    """
+
+    def __init__(self, max_entries=256, ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(query, params):
+        return query, tuple(params)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, stored = entry
+            if self.ttl is not None and time.monotonic() - stored > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value, generation):
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
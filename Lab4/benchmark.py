@@ -0,0 +1,274 @@
+"""Нагрузочный тест HTTP-приложения Lab4.
+
+Создаёт временную базу с N клиентами, запускает сервер отдельным процессом
+и гоняет по нему смесь запросов из нескольких параллельных клиентов.
+В конце печатает пропускную способность и перцентили задержек; результат
+можно сохранить (--save) и сравнить со следующим прогоном (--baseline).
+
+Пример:
+    python benchmark.py --rows 100000 --concurrency 16 --duration 20
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+
+LAB4_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVERS = {
+    "threaded": os.path.join(LAB4_DIR, "presenter", "app.py"),
+    "async": os.path.join(LAB4_DIR, "presenter", "async_app.py"),
+}
+DEFAULT_MIX = "home=50,details=30,add=10,edit=5,delete=5"
+FORM_HEADERS = {"Content-Type": "application/x-www-form-urlencoded"}
+
+
+def seed_database(path, rows, batch_size=10000):
+    """Создание базы с rows клиентами."""
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS clients (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fio TEXT NOT NULL,
+            phone TEXT NOT NULL,
+            address TEXT NOT NULL,
+            inn TEXT NOT NULL,
+            birth_date TEXT NOT NULL
+        )
+    """)
+    for start in range(0, rows, batch_size):
+        conn.executemany(
+            "INSERT INTO clients (fio, phone, address, inn, birth_date) VALUES (?, ?, ?, ?, ?)",
+            (random_client(i) for i in range(start, min(start + batch_size, rows)))
+        )
+    conn.commit()
+    conn.close()
+
+
+def random_client(i):
+    return (f"Клиент {i} Тестович", f"+7{random.randint(10**9, 10**10 - 1)}",
+            f"ул. Тестовая, д. {i % 300}", f"{random.randint(10**11, 10**12 - 1)}", "1990-01-01")
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("home", "details", "add", "edit", "delete"):
+            raise ValueError(f"Unknown operation in mix: {name}")
+        mix[name] = float(weight)
+    return mix
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(kind, db_path, port, workers):
+    args = [sys.executable, SERVERS[kind], "--host", "127.0.0.1", "--port", str(port), "--db", db_path]
+    args += ["--workers", str(workers)] if kind == "threaded" else ["--db-workers", str(workers)]
+    env = dict(os.environ, PYTHONPATH=LAB4_DIR)
+    process = subprocess.Popen(args, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Server did not start in time")
+
+
+class Worker(threading.Thread):
+    """Один виртуальный клиент: keep-alive соединение и случайные операции из смеси."""
+
+    def __init__(self, port, mix, max_id, stop_at, requests_left):
+        super().__init__(daemon=True)
+        self.port = port
+        self.operations = list(mix)
+        self.weights = list(mix.values())
+        self.max_id = max_id
+        self.stop_at = stop_at
+        self.requests_left = requests_left
+        self.samples = []
+        self.errors = 0
+        self.conn = None
+
+    def run(self):
+        while time.monotonic() < self.stop_at and self.requests_left.take():
+            operation = random.choices(self.operations, self.weights)[0]
+            started = time.perf_counter()
+            try:
+                status = self.request(operation)
+                ok = status < 400
+            except (OSError, http.client.HTTPException):
+                self.conn = None
+                ok = False
+            elapsed = time.perf_counter() - started
+            if ok:
+                self.samples.append((operation, elapsed))
+            else:
+                self.errors += 1
+        # Открытое keep-alive соединение занимает поток сервера до таймаута.
+        if self.conn is not None:
+            self.conn.close()
+
+    def request(self, operation):
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+        client_id = random.randint(1, self.max_id)
+        if operation == "home":
+            path = "/" if random.random() < 0.5 else f"/?after={client_id}"
+            self.conn.request("GET", path, headers={"Accept-Encoding": "gzip"})
+        elif operation == "details":
+            self.conn.request("GET", f"/details?id={client_id}", headers={"Accept-Encoding": "gzip"})
+        elif operation == "delete":
+            self.conn.request("POST", "/delete", urlencode({"id": client_id}), FORM_HEADERS)
+        else:
+            fio, phone, address, inn, birth_date = random_client(client_id)
+            form = {"fio": fio, "phone": phone, "address": address, "inn": inn, "birth_date": birth_date}
+            if operation == "edit":
+                form["id"] = client_id
+            self.conn.request("POST", f"/{operation}", urlencode(form), FORM_HEADERS)
+        response = self.conn.getresponse()
+        response.read()
+        if response.getheader("Connection", "").lower() == "close":
+            self.conn.close()
+            self.conn = None
+        return response.status
+
+
+class RequestBudget:
+    def __init__(self, total):
+        self.left = total
+        self.lock = threading.Lock()
+
+    def take(self):
+        if self.left is None:
+            return True
+        with self.lock:
+            if self.left <= 0:
+                return False
+            self.left -= 1
+            return True
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def summarize(samples, errors, elapsed):
+    groups = {"all": [latency for _, latency in samples]}
+    for operation, latency in samples:
+        groups.setdefault(operation, []).append(latency)
+    report = {"elapsed": elapsed, "errors": errors, "operations": {}}
+    for name, latencies in groups.items():
+        latencies.sort()
+        report["operations"][name] = {
+            "requests": len(latencies),
+            "rps": len(latencies) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+        }
+    return report
+
+
+def print_report(report, baseline=None):
+    print(f"Elapsed: {report['elapsed']:.2f} s, errors: {report['errors']}")
+    print(f"{'operation':<10} {'requests':>9} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, row in report["operations"].items():
+        line = (f"{name:<10} {row['requests']:>9} {row['rps']:>9.1f} "
+                f"{row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f}")
+        base = (baseline or {}).get("operations", {}).get(name)
+        if base:
+            line += "   vs baseline: " + ", ".join(
+                f"{key} {delta(row[key], base[key])}" for key in ("rps", "p50_ms", "p99_ms"))
+        print(line)
+
+
+def delta(current, previous):
+    if not previous:
+        return "n/a"
+    return f"{(current - previous) / previous * 100:+.1f}%"
+
+
+def run(args):
+    mix = parse_mix(args.mix)
+    workdir = tempfile.mkdtemp(prefix="pawnshop-bench-")
+    db_path = os.path.join(workdir, "pawnshop.db")
+    print(f"Seeding {args.rows} clients into {db_path} ...")
+    seed_database(db_path, args.rows)
+
+    port = free_port()
+    server = start_server(args.server, db_path, port, args.workers)
+    try:
+        if args.warmup:
+            warmup = Worker(port, mix, args.rows, time.monotonic() + args.warmup, RequestBudget(None))
+            warmup.run()
+
+        stop_at = time.monotonic() + (args.duration if args.requests is None else 10 ** 9)
+        budget = RequestBudget(args.requests)
+        workers = [Worker(port, mix, args.rows, stop_at, budget) for _ in range(args.concurrency)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    samples = [sample for worker in workers for sample in worker.samples]
+    report = summarize(samples, sum(worker.errors for worker in workers), elapsed)
+    report["config"] = {key: getattr(args, key) for key in
+                        ("server", "rows", "concurrency", "workers", "mix", "duration", "requests")}
+    return report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест сервера клиентов ломбарда")
+    parser.add_argument("--server", choices=sorted(SERVERS), default="threaded")
+    parser.add_argument("--rows", type=int, default=10000, help="сколько клиентов создать в базе")
+    parser.add_argument("--concurrency", type=int, default=8, help="число параллельных клиентов")
+    parser.add_argument("--workers", type=int, default=8, help="потоки сервера (--db-workers для async)")
+    parser.add_argument("--duration", type=float, default=10, help="длительность замера, секунд")
+    parser.add_argument("--requests", type=int, default=None, help="вместо длительности - число запросов")
+    parser.add_argument("--warmup", type=float, default=1, help="прогрев перед замером, секунд")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="веса операций home/details/add/edit/delete")
+    parser.add_argument("--save", help="сохранить результат в JSON")
+    parser.add_argument("--baseline", help="сравнить с ранее сохранённым результатом")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = run(args)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+    print_report(report, baseline)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
@@ -1,56 +1,160 @@
-import sqlite3
+import os
+import threading
+import time
+
+from model.connection_pool import ConnectionPool
+
+# SQLite допускает только одного писателя: сериализуем записи между потоками сервера,
+# чтобы они ждали друг друга, а не получали "database is locked".
+_write_lock = threading.Lock()
+
+PAGE_SIZE = 50
+
+DEFAULT_DB_NAME = "C:/Users/Гамлет/Desktop/InfoSysDesign/pawnshop.db"
+
 
 class ClientModel:
-    def __init__(self, db_name="C:/Users/Гамлет/Desktop/InfoSysDesign/pawnshop.db"):
-        self.conn = sqlite3.connect(db_name)
+    def __init__(self, db_name=DEFAULT_DB_NAME, timeout=30,
+                 pool=None, pool_size=8):
+        self.pool = pool or ConnectionPool(db_name, max_size=pool_size, busy_timeout=timeout)
+        # Версия данных меняется при каждой записи через модель; метка экземпляра
+        # отличает версии разных запусков сервера.
+        self._instance_tag = os.urandom(4).hex()
+        self._version = 0
+        self.last_modified = time.time()
+        self._listeners = []
+
+    @property
+    def data_version(self):
+        """Дешёвая версия данных для условных HTTP-запросов."""
+        return f"{self._instance_tag}-{self._version}"
+
+    def add_listener(self, callback):
+        """Подписка на изменения: callback(client_id) вызывается после каждой записи."""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def _data_changed(self, client_id):
+        self._version += 1
+        self.last_modified = time.time()
+        for callback in self._listeners:
+            callback(client_id)
 
     def _create_table(self):
         """Создание таблицы, если её нет."""
-        self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS clients (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                fio TEXT NOT NULL,
-                phone TEXT NOT NULL,
-                address TEXT NOT NULL,
-                inn TEXT NOT NULL,
-                birth_date TEXT NOT NULL
-            )
-        """)
-        self.conn.commit()
+        with self.pool.connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS clients (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    fio TEXT NOT NULL,
+                    phone TEXT NOT NULL,
+                    address TEXT NOT NULL,
+                    inn TEXT NOT NULL,
+                    birth_date TEXT NOT NULL
+                )
+            """)
+            conn.commit()
 
     def get_all_clients(self):
         """Получение списка всех клиентов."""
-        cursor = self.conn.execute("SELECT id, fio, phone FROM clients")
-        return cursor.fetchall()
+        with self.pool.connection() as conn:
+            cursor = conn.execute("SELECT id, fio, phone FROM clients")
+            return cursor.fetchall()
+
+    def get_clients_page(self, after_id=None, before_id=None, limit=PAGE_SIZE):
+        """Страница клиентов по ключу id: после after_id или перед before_id."""
+        page = self.iter_clients_page(after_id, before_id, limit)
+        rows = list(page)
+        return {"clients": rows, "has_prev": page.has_prev, "has_next": page.has_next}
+
+    def iter_clients_page(self, after_id=None, before_id=None, limit=PAGE_SIZE):
+        """Страница клиентов, строки которой читаются из курсора по мере обхода."""
+        return ClientPage(self.pool, after_id, before_id, limit)
 
     def get_client_by_id(self, client_id):
         """Получение данных клиента по ID."""
-        cursor = self.conn.execute(
-            "SELECT id, fio, phone, address, inn, birth_date FROM clients WHERE id = ?",
-            (client_id,)
-        )
-        return cursor.fetchone()
+        with self.pool.connection() as conn:
+            cursor = conn.execute(
+                "SELECT id, fio, phone, address, inn, birth_date FROM clients WHERE id = ?",
+                (client_id,)
+            )
+            return cursor.fetchone()
 
     def add_client(self, client_data):
         """Добавление клиента."""
-        self.conn.execute("""
-            INSERT INTO clients (fio, phone, address, inn, birth_date)
-            VALUES (?, ?, ?, ?, ?)
-        """, (client_data['fio'], client_data['phone'], client_data['address'],
-              client_data['inn'], client_data['birth_date']))
-        self.conn.commit()
+        with _write_lock, self.pool.connection() as conn:
+            cursor = conn.execute("""
+                INSERT INTO clients (fio, phone, address, inn, birth_date)
+                VALUES (?, ?, ?, ?, ?)
+            """, (client_data['fio'], client_data['phone'], client_data['address'],
+                  client_data['inn'], client_data['birth_date']))
+            conn.commit()
+            self._data_changed(cursor.lastrowid)
+            return cursor.lastrowid
 
     def delete_client(self, client_id):
         """Удаление клиента."""
-        self.conn.execute("DELETE FROM clients WHERE id = ?", (client_id,))
-        self.conn.commit()
-        
+        with _write_lock, self.pool.connection() as conn:
+            conn.execute("DELETE FROM clients WHERE id = ?", (client_id,))
+            conn.commit()
+            self._data_changed(client_id)
+
     def update_client(self, client_id, client_data):
         """Обновление данных клиента."""
-        self.conn.execute("""
-            UPDATE clients
-            SET fio = ?, phone = ?, address = ?, inn = ?, birth_date = ?
-            WHERE id = ?
-        """, (client_data['fio'], client_data['phone'], client_data['address'],
-            client_data['inn'], client_data['birth_date'], client_id))
-        self.conn.commit()
\ No newline at end of file
+        with _write_lock, self.pool.connection() as conn:
+            conn.execute("""
+                UPDATE clients
+                SET fio = ?, phone = ?, address = ?, inn = ?, birth_date = ?
+                WHERE id = ?
+            """, (client_data['fio'], client_data['phone'], client_data['address'],
+                client_data['inn'], client_data['birth_date'], client_id))
+            conn.commit()
+            self._data_changed(client_id)
+
+    def close(self):
+        """Закрытие соединений пула."""
+        self.pool.close()
+
+
+class ClientPage:
+    """Ленивая страница списка клиентов (keyset-пагинация по id).
+
+    Строки не загружаются целиком: курсор читается во время обхода, а после
+    него заполняются first_id/last_id и признаки наличия соседних страниц.
+    """
+
+    def __init__(self, pool, after_id=None, before_id=None, limit=PAGE_SIZE):
+        self.pool = pool
+        self.after_id = after_id
+        self.before_id = before_id
+        self.limit = limit
+        self.first_id = None
+        self.last_id = None
+        self.has_prev = False
+        self.has_next = False
+
+    def __iter__(self):
+        with self.pool.connection() as conn:
+            if self.before_id is not None:
+                cursor = conn.execute("""
+                    SELECT id, fio, phone FROM (
+                        SELECT id, fio, phone FROM clients WHERE id < ? ORDER BY id DESC LIMIT ?
+                    ) ORDER BY id
+                """, (self.before_id, self.limit))
+            else:
+                cursor = conn.execute(
+                    "SELECT id, fio, phone FROM clients WHERE id > ? ORDER BY id LIMIT ?",
+                    (self.after_id or 0, self.limit)
+                )
+            for row in cursor:
+                if self.first_id is None:
+                    self.first_id = row[0]
+                self.last_id = row[0]
+                yield row
+            if self.first_id is not None:
+                self.has_prev = self._exists(conn, "id < ?", self.first_id)
+                self.has_next = self._exists(conn, "id > ?", self.last_id)
+
+    @staticmethod
+    def _exists(conn, condition, value):
+        return conn.execute(f"SELECT 1 FROM clients WHERE {condition} LIMIT 1", (value,)).fetchone() is not None
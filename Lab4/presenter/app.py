@@ -1,29 +1,56 @@
 import sys
 sys.path.append('C:/Users/Гамлет/Desktop/InfoSysDesign/Lab4')
 
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate, parsedate_to_datetime
 from http.server import BaseHTTPRequestHandler, HTTPServer
 from urllib.parse import parse_qs
-from model.client_model import ClientModel
+from model.client_model import DEFAULT_DB_NAME, ClientModel
+from presenter.encoding import accepts_gzip
+from presenter.metrics import MetricsRegistry, PhaseTimer, TimedIterable
+from presenter.page_cache import PageCache
 from view.client_view import ClientView
+import argparse
+import gzip
+import hashlib
 import logging
+import threading
+import zlib
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Сколько символов страницы накапливается перед отправкой очередного chunk.
+STREAM_CHUNK_SIZE = 8192
+# Ответы короче этого размера не сжимаются: выигрыш меньше накладных расходов gzip.
+GZIP_MIN_SIZE = 1024
+
 
 class ClientPresenter(BaseHTTPRequestHandler):
-    def __init__(self, *args, **kwargs):
-        self.model = ClientModel()
-        self.view = ClientView()
-        super().__init__(*args, **kwargs)
+    # HTTP/1.1 нужен для chunked-ответов, но keep-alive не поддерживается: поток
+    # на соединение держал бы рабочий поток, пока клиент простаивает, и пара
+    # браузеров занимала бы весь пул. После каждого ответа соединение закрывается
+    # (см. end_headers); timeout ограничивает ожидание медленного запроса.
+    protocol_version = "HTTP/1.1"
+    timeout = 5
+    # Заголовки и тело уходят отдельными send(); без TCP_NODELAY алгоритм Нейгла
+    # вместе с отложенным ACK клиента добавляет ~40 мс к ответу.
+    disable_nagle_algorithm = True
+    # Модель и представление общие для всех запросов: соединения берутся из пула модели.
+    model = ClientModel()
+    view = ClientView()
+    page_cache = PageCache()
+    metrics = MetricsRegistry()
+    _validators = None
+    _post_body = b""
 
     def do_GET(self):
         routes = {
             "/": self.handle_home,
             "/details": self.handle_details,
             "/form": self.handle_form,
+            "/metrics": self.handle_metrics,
         }
-        handler = routes.get(self._get_route(), self.handle_not_found)
-        handler()
+        self._dispatch(routes, self._get_route())
 
     def do_POST(self):
         routes = {
@@ -31,34 +58,89 @@ class ClientPresenter(BaseHTTPRequestHandler):
             "/edit": self.handle_edit,
             "/delete": self.handle_delete,
         }
-        handler = routes.get(self.path, self.handle_not_found)
-        handler()
+        # Тело читается до выбора маршрута, даже если маршрута нет (404): иначе
+        # непрочитанный остаток был бы принят за следующий запрос соединения.
+        self._post_body = self._read_body()
+        self._dispatch(routes, self._get_route())
+
+    def end_headers(self):
+        if not self.close_connection:
+            self.send_header("Connection", "close")
+        super().end_headers()
+
+    def _dispatch(self, routes, route):
+        """Вызов обработчика маршрута с замером времени по фазам (db, render, write)."""
+        handler = routes.get(route)
+        self.timer = PhaseTimer()
+        # Экземпляр обработчика живёт всё соединение: валидаторы прошлого ответа не переносятся.
+        self._validators = None
+        try:
+            (handler or self.handle_not_found)()
+        finally:
+            label = route if handler else "not_found"
+            for phase, seconds in self.timer.totals.items():
+                self.metrics.observe(label, phase, seconds)
+            self.metrics.observe(label, "total", self.timer.elapsed())
 
     def handle_home(self):
-        clients = self.model.get_all_clients()
-        html = self.view.render_template("templates/index.html", {"clients": clients})
-        self._send_response(html)
+        try:
+            after_id = self._get_int_param("after")
+            before_id = self._get_int_param("before")
+            page = max(self._get_int_param("page") or 1, 1)
+        except ValueError:
+            self.handle_bad_request("Invalid page parameters.")
+            return
+        if self._not_modified("templates/index.html"):
+            return
+        key = ("index", after_id, before_id, page, self.view.template_mtime("templates/index.html"))
+        if self._send_cached(key):
+            return
+        generation = self.page_cache.generation
+        clients = TimedIterable(self.model.iter_clients_page(after_id=after_id, before_id=before_id),
+                                self.timer, "db")
+        chunks = self.view.stream_template("templates/index.html", {"clients": clients, "page": page})
+        captured = []
+        if self._send_stream(chunks, capture=captured):
+            self._cache_page(key, b"".join(captured), generation)
 
     def handle_details(self):
         client_id = self._get_query_param("id")
         if client_id:
-            client = self.model.get_client_by_id(int(client_id))
-            html = self.view.render_template("templates/details.html", {"client": client})
-            self._send_response(html)
+            if self._not_modified("templates/details.html"):
+                return
+            client_id = int(client_id)
+            key = ("details", client_id, self.view.template_mtime("templates/details.html"))
+            if self._send_cached(key):
+                return
+            generation = self.page_cache.generation
+            with self.timer.phase("db"):
+                client = self.model.get_client_by_id(client_id)
+            with self.timer.phase("render"):
+                body = self.view.render_template("templates/details.html", {"client": client}).encode()
+            gzip_body = self._cache_page(key, body, generation)
+            self._send_body(body, gzip_body)
         else:
             self.handle_bad_request("Client ID is missing.")
 
     def handle_form(self):
         client_id = self._get_query_param("id")
-        client = self.model.get_client_by_id(int(client_id)) if client_id else None
-        html = self.view.render_template("templates/form.html", {"client": client})
+        if self._not_modified("templates/form.html"):
+            return
+        with self.timer.phase("db"):
+            client = self.model.get_client_by_id(int(client_id)) if client_id else None
+        with self.timer.phase("render"):
+            html = self.view.render_template("templates/form.html", {"client": client})
         self._send_response(html)
 
+    def handle_metrics(self):
+        self._send_response(self.metrics.render(), content_type="text/plain; version=0.0.4")
+
     def handle_add(self):
         try:
             post_data = self._parse_post_data()
             client_data = self._extract_client_data(post_data)
-            self.model.add_client(client_data)
+            with self.timer.phase("db"):
+                self.model.add_client(client_data)
             self._redirect("/")
         except KeyError as e:
             self.handle_bad_request(f"Missing form field: {e}")
@@ -68,7 +150,8 @@ class ClientPresenter(BaseHTTPRequestHandler):
             post_data = self._parse_post_data()
             client_id = int(post_data["id"][0])
             client_data = self._extract_client_data(post_data)
-            self.model.update_client(client_id, client_data)
+            with self.timer.phase("db"):
+                self.model.update_client(client_id, client_data)
             self._redirect("/")
         except Exception as e:
             logging.error(f"Error updating client: {e}")
@@ -78,22 +161,154 @@ class ClientPresenter(BaseHTTPRequestHandler):
         try:
             post_data = self._parse_post_data()
             client_id = int(post_data["id"][0])
-            self.model.delete_client(client_id)
+            with self.timer.phase("db"):
+                self.model.delete_client(client_id)
             self._redirect("/")
         except Exception as e:
             logging.error(f"Error deleting client: {e}")
             self.handle_bad_request("Failed to delete client.")
 
-    def _send_response(self, html, status=200):
+    def _not_modified(self, template_path):
+        """Проверка условного GET: при совпадении ETag/Last-Modified отвечает 304."""
+        last_modified = int(max(self.model.last_modified, self.view.template_mtime(template_path)))
+        tag = hashlib.sha1(
+            f"{self.model.data_version}|{last_modified}|{self.path}".encode()
+        ).hexdigest()[:20]
+        # Слабый ETag: gzip- и обычная версии ответа считаются одним представлением.
+        etag = f'W/"{tag}"'
+        self._validators = {"ETag": etag, "Last-Modified": formatdate(last_modified, usegmt=True)}
+
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            candidates = [value.strip().removeprefix("W/") for value in if_none_match.split(",")]
+            fresh = etag.removeprefix("W/") in candidates or "*" in candidates
+        else:
+            fresh = self._not_modified_since(last_modified)
+        if not fresh:
+            return False
+
+        self.send_response(304)
+        self._send_validators()
+        self.end_headers()
+        return True
+
+    def _not_modified_since(self, last_modified):
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if not if_modified_since:
+            return False
+        try:
+            return last_modified <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    def _send_validators(self):
+        if self._validators:
+            for name, value in self._validators.items():
+                self.send_header(name, value)
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Vary", "Accept-Encoding")
+
+    def _accepts_gzip(self):
+        return accepts_gzip(self.headers.get("Accept-Encoding"))
+
+    def _send_cached(self, key):
+        entry = self.page_cache.get(key)
+        if entry is None:
+            return False
+        self._send_body(*entry)
+        return True
+
+    def _cache_page(self, key, body, generation):
+        gzip_body = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_SIZE else None
+        self.page_cache.put(key, body, gzip_body, generation=generation)
+        return gzip_body
+
+    def _send_response(self, html, status=200, content_type="text/html"):
+        with self.timer.phase("write"):
+            body = html.encode()
+            gzip_body = None
+            if len(body) >= GZIP_MIN_SIZE and self._accepts_gzip():
+                gzip_body = gzip.compress(body, compresslevel=6)
+            self._send_body(body, gzip_body, status, content_type)
+
+    def _send_body(self, body, gzip_body=None, status=200, content_type="text/html"):
+        with self.timer.phase("write"):
+            use_gzip = gzip_body is not None and self._accepts_gzip()
+            payload = gzip_body if use_gzip else body
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            if use_gzip:
+                self.send_header("Content-Encoding", "gzip")
+            self._send_validators()
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    def _send_stream(self, chunks, status=200, capture=None):
+        """Отправка страницы частями (chunked), не собирая её целиком в памяти.
+
+        Если передан список capture, в него складываются отправленные части
+        (для кэша страниц). Возвращает True, если страница отправлена целиком.
+        """
+        chunked = self.request_version != "HTTP/1.0"
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if self._accepts_gzip() else None
         self.send_response(status)
         self.send_header("Content-Type", "text/html")
+        if compressor:
+            self.send_header("Content-Encoding", "gzip")
+        self._send_validators()
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            self.close_connection = True
         self.end_headers()
-        self.wfile.write(html.encode())
+
+        def write(data, final=False):
+            if capture is not None:
+                capture.append(data)
+            if compressor:
+                # SYNC_FLUSH отдаёт сжатые данные сразу, не дожидаясь конца страницы.
+                data = compressor.compress(data) + compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+            if not data:
+                return
+            if chunked:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            else:
+                self.wfile.write(data)
+
+        buffer = []
+        buffered = 0
+        try:
+            while True:
+                with self.timer.phase("render"):
+                    chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                buffer.append(chunk)
+                buffered += len(chunk)
+                if buffered >= STREAM_CHUNK_SIZE:
+                    with self.timer.phase("write"):
+                        write("".join(buffer).encode())
+                    buffer, buffered = [], 0
+            with self.timer.phase("write"):
+                write("".join(buffer).encode(), final=True)
+                if chunked:
+                    self.wfile.write(b"0\r\n\r\n")
+            return True
+        except Exception as e:
+            # Заголовки уже отправлены: обрываем соединение, чтобы клиент увидел неполный ответ.
+            logging.error(f"Streaming of {self.path} failed: {e}")
+            self.close_connection = True
+            return False
+        finally:
+            chunks.close()
 
     def _redirect(self, location):
-        self.send_response(302)
-        self.send_header("Location", location)
-        self.end_headers()
+        with self.timer.phase("write"):
+            self.send_response(302)
+            self.send_header("Location", location)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
 
     def _get_query_param(self, param):
         try:
@@ -106,9 +321,23 @@ class ClientPresenter(BaseHTTPRequestHandler):
             logging.error(f"Failed to get query parameter '{param}': {e}")
             return None
 
+    def _get_int_param(self, param):
+        value = self._get_query_param(param)
+        return int(value) if value else None
+
+    def _read_body(self):
+        """Тело запроса по Content-Length; если длину не узнать, соединение закрывается."""
+        try:
+            content_length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            content_length = -1
+        if content_length < 0 or "Transfer-Encoding" in self.headers:
+            self.close_connection = True
+            return b""
+        return self.rfile.read(content_length)
+
     def _parse_post_data(self):
-        content_length = int(self.headers['Content-Length'])
-        return parse_qs(self.rfile.read(content_length).decode())
+        return parse_qs(self._post_body.decode())
 
     def _extract_client_data(self, post_data):
         return {
@@ -130,7 +359,75 @@ class ClientPresenter(BaseHTTPRequestHandler):
     def _get_route(self):
         return self.path.split("?")[0]
 
+
+class PooledHTTPServer(HTTPServer):
+    """HTTP-сервер с ограниченным пулом рабочих потоков и очередью запросов."""
+
+    def __init__(self, server_address, handler_class, workers=8, queue_size=32):
+        super().__init__(server_address, handler_class)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="clerk")
+        self.slots = threading.BoundedSemaphore(workers + queue_size)
+
+    def process_request(self, request, client_address):
+        if not self.slots.acquire(blocking=False):
+            logging.warning(f"Request queue is full, rejecting {client_address[0]}")
+            self._reject(request)
+            return
+        self.executor.submit(self._process_in_worker, request, client_address)
+
+    def _process_in_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+
+    def _reject(self, request):
+        try:
+            request.sendall(b"HTTP/1.0 503 Service Unavailable\r\n"
+                            b"Retry-After: 1\r\nContent-Length: 0\r\n\r\n")
+        except OSError:
+            pass
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+
+def create_server(host="localhost", port=8080, workers=8, queue_size=32, model=None):
+    if model is not None:
+        ClientPresenter.model = model
+    ClientPresenter.model.add_listener(ClientPresenter.page_cache.invalidate_client)
+    if workers <= 1:
+        return HTTPServer((host, port), ClientPresenter)
+    return PooledHTTPServer((host, port), ClientPresenter, workers=workers, queue_size=queue_size)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Сервер учёта клиентов ломбарда")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--db", default=DEFAULT_DB_NAME, help="путь к файлу базы SQLite")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="число рабочих потоков (1 - последовательная обработка)")
+    parser.add_argument("--queue-size", type=int, default=32,
+                        help="сколько запросов может ждать свободного потока")
+    parser.add_argument("--pool-size", type=int, default=None,
+                        help="максимум соединений с БД (по умолчанию равен числу потоков)")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    server = HTTPServer(('localhost', 8080), ClientPresenter)
-    logging.info("Server started at http://localhost:8080")
-    server.serve_forever()
\ No newline at end of file
+    args = parse_args()
+    model = ClientModel(args.db, pool_size=args.pool_size or max(args.workers, 1))
+    server = create_server(args.host, args.port, args.workers, args.queue_size, model=model)
+    logging.info(f"Server started at http://{args.host}:{args.port} with {args.workers} worker(s)")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        model.close()
\ No newline at end of file
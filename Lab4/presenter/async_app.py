@@ -0,0 +1,296 @@
+import sys
+sys.path.append('C:/Users/Гамлет/Desktop/InfoSysDesign/Lab4')
+
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+from model.client_model import DEFAULT_DB_NAME, ClientModel
+from presenter.encoding import accepts_gzip
+from view.client_view import ClientView
+import argparse
+import asyncio
+import gzip
+import logging
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Сколько секунд ждать следующего запроса в keep-alive соединении.
+KEEPALIVE_TIMEOUT = 15
+MAX_HEADER_SIZE = 64 * 1024
+MAX_BODY_SIZE = 1024 * 1024
+GZIP_MIN_SIZE = 1024
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Request:
+    def __init__(self, method, target, version, headers, body=b""):
+        self.method = method
+        self.version = version
+        self.headers = headers
+        self.body = body
+        parts = urlsplit(target)
+        self.path = target
+        self.route = parts.path
+        self.query = parse_qs(parts.query)
+
+    def get_param(self, name):
+        return self.query.get(name, [None])[0]
+
+    def get_int_param(self, name):
+        value = self.get_param(name)
+        return int(value) if value else None
+
+    @property
+    def keep_alive(self):
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    def form(self):
+        return parse_qs(self.body.decode())
+
+
+class AsyncClientPresenter:
+    """Асинхронный вариант ClientPresenter: одно событийное ядро на все соединения.
+
+    Сокеты обслуживаются в цикле asyncio, а обращения к ClientModel и рендеринг
+    выполняются в пуле потоков, чтобы не блокировать цикл.
+    """
+
+    def __init__(self, model, view=None, db_workers=8):
+        self.model = model
+        self.view = view or ClientView()
+        self.executor = ThreadPoolExecutor(max_workers=db_workers, thread_name_prefix="db")
+        self.get_routes = {
+            "/": self.handle_home,
+            "/details": self.handle_details,
+            "/form": self.handle_form,
+        }
+        self.post_routes = {
+            "/add": self.handle_add,
+            "/edit": self.handle_edit,
+            "/delete": self.handle_delete,
+        }
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), KEEPALIVE_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except HTTPError as e:
+                    writer.write(self._response(e.status, f"<h1>{e.message}</h1>", keep_alive=False))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+
+                response = await self.dispatch(request)
+                writer.write(response)
+                await writer.drain()
+                logging.info(f'"{request.method} {request.path} {request.version}"')
+                if not request.keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, request):
+        if request.method not in ("GET", "POST"):
+            return self._response(HTTPStatus.NOT_IMPLEMENTED, "<h1>501 Not Implemented</h1>", request)
+        routes = self.get_routes if request.method == "GET" else self.post_routes
+        handler = routes.get(request.route)
+        if handler is None:
+            logging.warning(f"Route not found: {request.path}")
+            return self._response(HTTPStatus.NOT_FOUND, "<h1>404 Not Found</h1>", request)
+        try:
+            return await handler(request)
+        except HTTPError as e:
+            logging.warning(f"Bad request: {e.message}")
+            return self._response(e.status, f"<h1>{e.message}</h1>", request)
+        except Exception as e:
+            logging.error(f"Error handling {request.method} {request.path}: {e}")
+            return self._response(HTTPStatus.INTERNAL_SERVER_ERROR, "<h1>500 Internal Server Error</h1>", request)
+
+    async def handle_home(self, request):
+        try:
+            after_id = request.get_int_param("after")
+            before_id = request.get_int_param("before")
+            page = max(request.get_int_param("page") or 1, 1)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid page parameters.")
+
+        def render():
+            clients = self.model.iter_clients_page(after_id=after_id, before_id=before_id)
+            return self.view.render_template("templates/index.html", {"clients": clients, "page": page})
+
+        return self._response(HTTPStatus.OK, await self._run(render), request)
+
+    async def handle_details(self, request):
+        client_id = request.get_param("id")
+        if not client_id:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Client ID is missing.")
+        try:
+            client_id = int(client_id)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid client ID.")
+
+        def render():
+            client = self.model.get_client_by_id(client_id)
+            return self.view.render_template("templates/details.html", {"client": client})
+
+        return self._response(HTTPStatus.OK, await self._run(render), request)
+
+    async def handle_form(self, request):
+        try:
+            client_id = request.get_int_param("id")
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid client ID.")
+
+        def render():
+            client = self.model.get_client_by_id(client_id) if client_id is not None else None
+            return self.view.render_template("templates/form.html", {"client": client})
+
+        return self._response(HTTPStatus.OK, await self._run(render), request)
+
+    async def handle_add(self, request):
+        try:
+            client_data = self._extract_client_data(request.form())
+        except KeyError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Missing form field: {e}")
+        await self._run(self.model.add_client, client_data)
+        return self._redirect("/", request)
+
+    async def handle_edit(self, request):
+        try:
+            post_data = request.form()
+            client_id = int(post_data["id"][0])
+            client_data = self._extract_client_data(post_data)
+            await self._run(self.model.update_client, client_id, client_data)
+        except Exception as e:
+            logging.error(f"Error updating client: {e}")
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Failed to edit client.")
+        return self._redirect("/", request)
+
+    async def handle_delete(self, request):
+        try:
+            client_id = int(request.form()["id"][0])
+            await self._run(self.model.delete_client, client_id)
+        except Exception as e:
+            logging.error(f"Error deleting client: {e}")
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Failed to delete client.")
+        return self._redirect("/", request)
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def _read_request(self, reader):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError as e:
+            if not e.partial.strip():
+                return None
+            raise
+        except asyncio.LimitOverrunError:
+            raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Headers too large.")
+
+        lines = head.decode("iso-8859-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split()
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line.")
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+        body = b""
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length.")
+        if length > MAX_BODY_SIZE:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large.")
+        if length:
+            body = await reader.readexactly(length)
+        return Request(method, target, version, headers, body)
+
+    @staticmethod
+    def _extract_client_data(post_data):
+        return {
+            "fio": post_data["fio"][0],
+            "phone": post_data["phone"][0],
+            "address": post_data["address"][0],
+            "inn": post_data["inn"][0],
+            "birth_date": post_data.get("birth_date", [""])[0],
+        }
+
+    def _redirect(self, location, request):
+        return self._build(HTTPStatus.FOUND, b"", request.keep_alive, {"Location": location})
+
+    def _response(self, status, html, request=None, keep_alive=None):
+        body = html.encode()
+        headers = {"Content-Type": "text/html"}
+        if request is not None and len(body) >= GZIP_MIN_SIZE and accepts_gzip(request.headers.get("accept-encoding")):
+            body = gzip.compress(body, compresslevel=6)
+            headers["Content-Encoding"] = "gzip"
+        if keep_alive is None:
+            keep_alive = request.keep_alive if request is not None else False
+        return self._build(status, body, keep_alive, headers)
+
+    @staticmethod
+    def _build(status, body, keep_alive, headers):
+        status = HTTPStatus(status)
+        lines = [f"HTTP/1.1 {status.value} {status.phrase}"]
+        headers = dict(headers, **{
+            "Content-Length": str(len(body)),
+            "Connection": "keep-alive" if keep_alive else "close",
+        })
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("iso-8859-1") + body
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+async def serve(host="localhost", port=8080, model=None, db_workers=8, db_name=DEFAULT_DB_NAME):
+    model = model or ClientModel(db_name, pool_size=db_workers)
+    presenter = AsyncClientPresenter(model, db_workers=db_workers)
+    server = await asyncio.start_server(presenter.handle_connection, host, port, limit=MAX_HEADER_SIZE)
+    logging.info(f"Async server started at http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        presenter.close()
+        model.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Асинхронный сервер учёта клиентов ломбарда")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--db", default=DEFAULT_DB_NAME, help="путь к файлу базы SQLite")
+    parser.add_argument("--db-workers", type=int, default=8,
+                        help="число потоков для обращений к БД и рендеринга")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, db_workers=args.db_workers, db_name=args.db))
+    except KeyboardInterrupt:
+        pass
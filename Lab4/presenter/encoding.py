@@ -0,0 +1,14 @@
+def accepts_gzip(accept_encoding):
+    """Разрешает ли заголовок Accept-Encoding ответ в gzip (с учётом q=0)."""
+    for coding in (accept_encoding or "").split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() not in ("gzip", "*"):
+            continue
+        params = params.replace(" ", "")
+        if not params.startswith("q="):
+            return True
+        try:
+            return float(params[2:]) > 0
+        except ValueError:
+            return False
+    return False
@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Границы корзин гистограммы в секундах.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram:
+    """Гистограмма длительностей в формате Prometheus (накопительные корзины)."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+
+class MetricsRegistry:
+    """Гистограммы задержек по маршрутам и фазам обработки запроса."""
+
+    def __init__(self, name="pawnshop_request_seconds", buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.buckets = buckets
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, route, phase, seconds):
+        with self._lock:
+            histogram = self._histograms.get((route, phase))
+            if histogram is None:
+                histogram = self._histograms[(route, phase)] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def render(self):
+        """Текстовый формат экспозиции Prometheus."""
+        lines = [
+            f"# HELP {self.name} Request latency by route and phase (db, render, write, total).",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            for (route, phase), histogram in sorted(self._histograms.items()):
+                labels = f'route="{route}",phase="{phase}"'
+                for bound, count in histogram.cumulative():
+                    lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"{self.name}_sum{{{labels}}} {histogram.sum:.6f}")
+                lines.append(f"{self.name}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+class PhaseTimer:
+    """Учёт времени одного запроса по фазам.
+
+    Фазы могут быть вложенными: пока идёт внутренняя фаза (например, чтение
+    курсора БД во время рендеринга), время внешней не накапливается.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.totals = defaultdict(float)
+        self._stack = []
+
+    @contextmanager
+    def phase(self, name):
+        now = time.perf_counter()
+        if self._stack:
+            outer = self._stack[-1]
+            self.totals[outer[0]] += now - outer[1]
+        self._stack.append([name, now])
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            current = self._stack.pop()
+            self.totals[current[0]] += now - current[1]
+            if self._stack:
+                self._stack[-1][1] = now
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+class TimedIterable:
+    """Обёртка, относящая время получения каждого элемента к заданной фазе.
+
+    Остальные атрибуты берутся у исходного объекта, поэтому шаблон видит,
+    например, has_next у ClientPage.
+    """
+
+    def __init__(self, iterable, timer, phase):
+        self._iterable = iterable
+        self._timer = timer
+        self._phase = phase
+
+    def __iter__(self):
+        iterator = iter(self._iterable)
+        while True:
+            with self._timer.phase(self._phase):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def __getattr__(self, name):
+        return getattr(self._iterable, name)
@@ -0,0 +1,76 @@
+import threading
+from collections import OrderedDict
+
+
+class PageCache:
+    """LRU-кэш отрендеренных страниц с ограничением по числу записей и объёму.
+
+    Ключ - кортеж (маршрут, параметры...), значение - готовые байты ответа
+    (обычные и, если есть, сжатые gzip). Записи списка клиентов и карточки
+    клиента удаляются моделью при изменении данных.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Получение страницы (body, gzip_body) или None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body, gzip_body=None, generation=None):
+        """Сохранение страницы.
+
+        generation - значение self.generation до чтения данных: если с тех пор
+        была инвалидация, страница могла устареть и не сохраняется.
+        """
+        entry_size = len(body) + len(gzip_body or b"")
+        if entry_size > self.max_bytes:
+            return False
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return False
+            self._remove(key)
+            self._entries[key] = (body, gzip_body)
+            self._size += entry_size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+            return True
+
+    def invalidate_client(self, client_id):
+        """Удаление карточки клиента и всех страниц списка."""
+        with self._lock:
+            self.generation += 1
+            stale = [key for key in self._entries
+                     if key[0] == "index" or (key[0] == "details" and key[1] == client_id)]
+            for key in stale:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses,
+                "entries": len(self._entries), "bytes": self._size}
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[0]) + len(entry[1] or b"")
@@ -1,12 +1,92 @@
-from jinja2 import Template
+import os
+import threading
+import time
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+TEMPLATES_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TemplateCache:
+    """Кэш скомпилированных шаблонов с инвалидацией по времени изменения файла."""
+
+    def __init__(self, root=TEMPLATES_ROOT, check_interval=2.0):
+        self.root = root
+        self.check_interval = check_interval
+        self.environment = Environment(
+            loader=FileSystemLoader(root),
+            bytecode_cache=FileSystemBytecodeCache(),
+            cache_size=0,
+            auto_reload=False,
+        )
+        self.hits = 0
+        self.misses = 0
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def get_template(self, template_path):
+        """Получение шаблона из кэша; файл проверяется не чаще check_interval секунд."""
+        return self._get_entry(template_path)["template"]
+
+    def get_mtime(self, template_path):
+        """Время изменения файла шаблона, на котором основан закэшированный шаблон."""
+        return self._get_entry(template_path)["mtime"]
+
+    def _get_entry(self, template_path):
+        now = time.monotonic()
+        entry = self._templates.get(template_path)
+        if entry is not None and now - entry["checked_at"] < self.check_interval:
+            self._count_hit()
+            return entry
+
+        mtime = os.path.getmtime(os.path.join(self.root, template_path))
+        if entry is not None and entry["mtime"] == mtime:
+            entry["checked_at"] = now
+            self._count_hit()
+            return entry
+
+        template = self.environment.loader.load(self.environment, template_path)
+        entry = {"template": template, "mtime": mtime, "checked_at": now}
+        with self._lock:
+            self._templates[template_path] = entry
+            self.misses += 1
+        return entry
+
+    def clear(self):
+        """Очистка кэша и счётчиков."""
+        with self._lock:
+            self._templates.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Статистика попаданий и промахов кэша."""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._templates)}
+
+    def _count_hit(self):
+        with self._lock:
+            self.hits += 1
+
+
+template_cache = TemplateCache()
+
 
 class ClientView:
+    def __init__(self, cache=None):
+        self.cache = cache or template_cache
+
     def render_template(self, template_path, context):
-        full_path = f"C:/Users/Гамлет/Desktop/InfoSysDesign/Lab4/{template_path}"
-        with open(full_path, 'r', encoding="utf-8") as file:
-            template = Template(file.read())
+        template = self.cache.get_template(template_path)
         return template.render(context)
 
+    def template_mtime(self, template_path):
+        return self.cache.get_mtime(template_path)
+
+    def stream_template(self, template_path, context):
+        """Потоковый рендеринг: шаблон отдаётся частями по мере вычисления."""
+        template = self.cache.get_template(template_path)
+        return template.generate(context)
+
     def render_index(self, clients):
         """Рендеринг списка клиентов."""
-        return self.render_template("templates/index.html", {"clients": clients})
\ No newline at end of file
+        return self.render_template("templates/index.html", {"clients": clients})
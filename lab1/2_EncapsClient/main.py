@@ -1,7 +1,11 @@
 import json
 
-# Класс для залогового объекта
+# Класс для залогового объекта.
+# Классы используют __slots__: атрибуты хранятся без словаря экземпляра,
+# что заметно экономит память при большом количестве объектов.
 class PledgeItem:
+    __slots__ = ("__item_name", "__item_value", "__loan_amount", "__return_date")
+
     def __init__(self, item_name, item_value, loan_amount, return_date):
         self.__item_name = self.validate_field(item_name, "Item name", max_length=100)
         self.__item_value = self.validate_number(item_value, "Item value")
@@ -28,6 +32,8 @@ class PledgeItem:
 
 
 class ClientBase:
+    __slots__ = ("__last_name", "__first_name", "__middle_name", "__address", "__phone")
+
     def __init__(self, last_name=None, first_name=None, middle_name=None, address="", phone=None, data=None):
         if data:
             if isinstance(data, str):
@@ -108,6 +114,8 @@ class ClientBase:
 
 
 class Client(ClientBase):
+    __slots__ = ("__pledges",)
+
     def __init__(self, last_name=None, first_name=None, middle_name=None, address="", phone=None, pledges=None, data=None):
         super().__init__(last_name, first_name, middle_name, address, phone, data)
         self.__pledges = pledges or []
@@ -127,6 +135,8 @@ class Client(ClientBase):
 
 
 class ClientBriefInfo(ClientBase):
+    __slots__ = ("__inn", "__ogrn")
+
     def __init__(self, last_name=None, first_name=None, middle_name=None, phone=None, inn=None, ogrn=None, data=None):
         super().__init__(last_name, first_name, middle_name, phone=phone, data=data)
         self.__inn = self.validate_field(inn, "INN", exact_length=12)